@@ -7,14 +7,78 @@ Shopping cart and cart item models for e-commerce functionality.
 """
 
 import uuid
-from django.db import models
+from contextlib import contextmanager
+from functools import cached_property
+from threading import local
+from django.db import models, router, transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from decimal import Decimal
 from django.core.validators import MinValueValidator
 
 User = get_user_model()
 
 
+class CartTouch:
+    """
+    on_commit callback bumping Cart.updated_at for a set of carts in one UPDATE.
+    """
+    
+    def __init__(self, using):
+        self.using = using
+        self.cart_ids = set()
+    
+    def __call__(self):
+        if self.cart_ids:
+            Cart.objects.using(self.using).filter(pk__in=self.cart_ids).update(updated_at=timezone.now())
+
+
+# Pending CartTouch per database alias, for the coalesce_cart_touches() block
+# running in this thread (database connections are per thread as well)
+_pending_touches = local()
+
+
+@contextmanager
+def coalesce_cart_touches(using=None):
+    """
+    Run a block of cart writes in one transaction with a single cart touch.
+    
+    touch_cart() calls inside the block only collect cart ids; they are
+    written by one UPDATE when the transaction commits. Nested blocks share
+    the outermost one's touch. If the block raises, nothing is touched.
+    """
+    using = using or router.db_for_write(Cart)
+    pending = _pending_touches.__dict__
+    if using in pending:
+        with transaction.atomic(using=using):
+            yield
+        return
+    
+    callback = pending[using] = CartTouch(using)
+    try:
+        with transaction.atomic(using=using):
+            yield
+            transaction.on_commit(callback, using=using)
+    finally:
+        del pending[using]
+
+
+def touch_cart(cart_id, using=None):
+    """Mark a cart as modified; the timestamp is written at commit"""
+    using = using or router.db_for_write(Cart)
+    callback = _pending_touches.__dict__.get(using)
+    if callback is not None:
+        callback.cart_ids.add(cart_id)
+        return
+    
+    callback = CartTouch(using)
+    callback.cart_ids.add(cart_id)
+    # Runs immediately when not in a transaction
+    transaction.on_commit(callback, using=using)
+
+
 class Cart(models.Model):
     """
     Shopping Cart Model
@@ -38,27 +102,59 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart for {self.user.username}"
     
+    @cached_property
+    def summary(self):
+        """
+        Item count and price totals for the cart, computed in one aggregate
+        query and cached on this instance (see refresh_summary).
+        
+        When items were prefetched (with their products) the totals are
+        summed from that cache instead, without another query.
+        """
+        items = getattr(self, '_prefetched_objects_cache', {}).get('items')
+        if items is not None:
+            return {
+                'total_items': sum(item.quantity for item in items),
+                'total_price': sum((item.subtotal for item in items), Decimal('0.00')),
+                'total_compare_price': sum((item.compare_subtotal for item in items), Decimal('0.00')),
+            }
+        
+        money = DecimalField(max_digits=12, decimal_places=2)
+        return self.items.aggregate(
+            total_items=Coalesce(Sum('quantity'), 0),
+            total_price=Coalesce(
+                Sum(F('quantity') * F('product__price'), output_field=money),
+                Value(Decimal('0.00')),
+                output_field=money
+            ),
+            total_compare_price=Coalesce(
+                Sum(
+                    F('quantity') * Coalesce('product__compare_price', 'product__price'),
+                    output_field=money
+                ),
+                Value(Decimal('0.00')),
+                output_field=money
+            ),
+        )
+    
+    def refresh_summary(self):
+        """Drop the cached summary after items changed"""
+        self.__dict__.pop('summary', None)
+    
     @property
     def total_items(self):
         """Get total number of items in cart"""
-        return sum(item.quantity for item in self.items.all())
+        return self.summary['total_items']
     
     @property
     def total_price(self):
         """Calculate total price of all items in cart"""
-        total = Decimal('0.00')
-        for item in self.items.select_related('product'):
-            total += item.subtotal
-        return total
+        return self.summary['total_price']
     
     @property
     def total_compare_price(self):
         """Calculate total compare price (original prices) of all items"""
-        total = Decimal('0.00')
-        for item in self.items.select_related('product'):
-            compare_price = item.product.compare_price or item.product.price
-            total += compare_price * item.quantity
-        return total
+        return self.summary['total_compare_price']
     
     @property
     def total_savings(self):
@@ -67,8 +163,10 @@ class Cart(models.Model):
     
     def clear(self):
         """Remove all items from cart"""
+        # One DELETE for the items and one UPDATE of the cart timestamp
         self.items.all().delete()
-        self.save()
+        self.refresh_summary()
+        touch_cart(self.pk)
 
 
 class CartItem(models.Model):
@@ -144,12 +242,13 @@ class CartItem(models.Model):
     def save(self, *args, **kwargs):
         """Override save to update cart's updated_at timestamp"""
         super().save(*args, **kwargs)
-        # Update cart's timestamp when item is modified
-        self.cart.save(update_fields=['updated_at'])
+        # Update cart's timestamp when item is modified (coalesced, at commit)
+        touch_cart(self.cart_id)
     
     def delete(self, *args, **kwargs):
         """Override delete to update cart's updated_at timestamp"""
-        cart = self.cart
-        super().delete(*args, **kwargs)
-        # Update cart's timestamp when item is deleted
-        cart.save(update_fields=['updated_at'])
\ No newline at end of file
+        cart_id = self.cart_id
+        result = super().delete(*args, **kwargs)
+        # Update cart's timestamp when item is deleted (coalesced, at commit)
+        touch_cart(cart_id)
+        return result
\ No newline at end of file
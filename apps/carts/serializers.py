@@ -56,17 +56,22 @@ class CartItemSerializer(serializers.ModelSerializer):
     
     def get_product_image(self, obj):
         """Get primary product image URL"""
-        primary_image = obj.product.images.filter(is_primary=True).first()
-        if primary_image:
+        primary_image_url = obj.product.primary_image_url
+        if primary_image_url:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(primary_image.image.url)
-            return primary_image.image.url
+                return request.build_absolute_uri(primary_image_url)
+            return primary_image_url
         return None
 
 
 class CartSerializer(serializers.ModelSerializer):
-    """Serializer for Cart display"""
+    """
+    Serializer for Cart display
+    
+    Pass a cart with items prefetched (select_related product) to render it
+    in a fixed number of queries; totals are then summed from the same cache.
+    """
     
     items = CartItemSerializer(many=True, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
@@ -162,4 +167,33 @@ class UpdateCartItemSerializer(serializers.Serializer):
                 'quantity': f'Only {cart_item.product.stock_quantity} items available in stock.'
             })
         
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class BulkCartOperationSerializer(serializers.Serializer):
+    """One line of a bulk cart request"""
+    
+    OP_CHOICES = ['add', 'set', 'remove']
+    
+    product_id = serializers.UUIDField(required=True)
+    op = serializers.ChoiceField(choices=OP_CHOICES, default='add')
+    quantity = serializers.IntegerField(required=False, min_value=0, max_value=999)
+    
+    def validate(self, attrs):
+        """add needs a positive quantity, set a quantity (0 removes the line)"""
+        op = attrs['op']
+        quantity = attrs.get('quantity')
+        
+        if op == 'add' and not quantity:
+            raise serializers.ValidationError({'quantity': 'Quantity must be at least 1.'})
+        if op == 'set' and quantity is None:
+            raise serializers.ValidationError({'quantity': 'Quantity is required.'})
+        
+        attrs.setdefault('quantity', 0)
+        return attrs
+
+
+class BulkCartSerializer(serializers.Serializer):
+    """Serializer for applying several cart changes at once"""
+    
+    items = BulkCartOperationSerializer(many=True, allow_empty=False, max_length=100)
@@ -0,0 +1,606 @@
+# apps/carts/store.py
+
+"""
+Cart Stores
+
+Cart reads and writes go through the store selected by the CART_BACKEND
+setting:
+
+- 'database' (default): Cart / CartItem rows are the source of truth.
+- 'redis': each user's cart lines live in one Redis hash, quantities are
+  changed with HINCRBY, and GET /carts/ is served from Redis plus a single
+  product query. Changed carts are written back to Cart / CartItem by the
+  persist_dirty_carts Celery task, and synchronously at checkout.
+
+Both stores return Cart / CartItem instances, so serializers and views
+don't care where the lines came from.
+"""
+
+import logging
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+import redis
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Prefetch, Subquery
+from django.utils import timezone
+
+from apps.products.models import Product
+from .models import Cart, CartItem, touch_cart
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    """Requested cart quantity exceeds the product's stock"""
+
+    def __init__(self, available, in_cart):
+        self.available = available
+        self.in_cart = in_cart
+        super().__init__(f'Only {available} items available. You have {in_cart} in cart.')
+
+
+MAX_LINE_QUANTITY = 999
+
+
+def plan_bulk_changes(current, operations, products):
+    """
+    Apply bulk cart operations to in-memory quantities.
+    
+    Args:
+        current (dict): {product_id: quantity} currently in the cart
+        operations (list): dicts with product_id, op ('add', 'set' or
+            'remove') and quantity, applied in order
+        products (dict): {product_id: Product} for the referenced products
+    
+    Returns:
+        tuple: (per-operation results, {product_id: new quantity} for the
+            lines that changed; 0 means remove the line)
+    """
+    quantities = dict(current)
+    results = []
+    for operation in operations:
+        product_id, op = operation['product_id'], operation['op']
+        in_cart = quantities.get(product_id, 0)
+        result = {'product_id': str(product_id), 'op': op}
+        
+        product = products.get(product_id)
+        if op == 'remove':
+            new_quantity = 0
+        elif product is None or not product.is_active:
+            results.append({**result, 'success': False, 'quantity': in_cart,
+                            'error': 'Product not found or is not active.'})
+            continue
+        elif op == 'add':
+            new_quantity = in_cart + operation['quantity']
+        else:
+            new_quantity = operation['quantity']
+        
+        if new_quantity and new_quantity > product.stock_quantity:
+            results.append({**result, 'success': False, 'quantity': in_cart,
+                            'error': f'Only {product.stock_quantity} items available.'})
+            continue
+        if new_quantity > MAX_LINE_QUANTITY:
+            results.append({**result, 'success': False, 'quantity': in_cart,
+                            'error': f'Quantity cannot exceed {MAX_LINE_QUANTITY}.'})
+            continue
+        
+        quantities[product_id] = new_quantity
+        results.append({**result, 'success': True, 'quantity': new_quantity})
+    
+    changed = {
+        product_id: quantity
+        for product_id, quantity in quantities.items()
+        if quantity != current.get(product_id, 0)
+    }
+    return results, changed
+
+
+class DatabaseCartStore:
+    """Cart lines stored as Cart / CartItem rows"""
+
+    def get_cart(self, user, with_items=False):
+        """
+        Get or create the user's cart
+
+        with_items loads the items and their products up front (two queries
+        in total, whatever the cart size) for serializing the full cart.
+        """
+        carts = Cart.objects.all()
+        if with_items:
+            carts = carts.prefetch_related(
+                Prefetch('items', queryset=CartItem.objects.select_related('product'))
+            )
+        cart, created = carts.get_or_create(user=user)
+        return cart
+
+    def add_item(self, user, product, quantity):
+        """
+        Add `quantity` of `product`; returns (cart_item, created)
+        
+        The increment and the stock check happen in the database, so
+        concurrent adds can't lose updates or exceed stock. Raises
+        InsufficientStock if the new quantity would exceed stock.
+        """
+        cart = self.get_cart(user)
+        if connections[CartItem.objects.db].vendor == 'postgresql':
+            cart_item, created = self._upsert_item(cart, product, quantity)
+        else:
+            cart_item, created = self._increment_or_create_item(cart, product, quantity)
+        
+        if cart_item is None:
+            in_cart = CartItem.objects.filter(cart=cart, product=product).values_list('quantity', flat=True).first()
+            product.refresh_from_db(fields=['stock_quantity'])
+            raise InsufficientStock(product.stock_quantity, in_cart or 0)
+        
+        return cart_item, created
+    
+    def _upsert_item(self, cart, product, quantity):
+        """
+        One INSERT ... ON CONFLICT DO UPDATE that increments the line only
+        while it stays within the product's current stock (PostgreSQL).
+        Returns (None, False) when the stock check fails.
+        """
+        item_table = CartItem._meta.db_table
+        product_table = Product._meta.db_table
+        now = timezone.now()
+        with connections[CartItem.objects.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {item_table} (id, cart_id, product_id, quantity, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (cart_id, product_id) DO UPDATE
+                SET quantity = {item_table}.quantity + EXCLUDED.quantity,
+                    updated_at = EXCLUDED.updated_at
+                WHERE {item_table}.quantity + EXCLUDED.quantity <= (
+                    SELECT stock_quantity FROM {product_table} WHERE id = EXCLUDED.product_id
+                )
+                RETURNING id, quantity, created_at, (xmax = 0) AS inserted
+                """,
+                [uuid.uuid4(), cart.pk, product.pk, quantity, now, now]
+            )
+            row = cursor.fetchone()
+        
+        if row is None:
+            return None, False
+        touch_cart(cart.pk)
+        item_id, new_quantity, created_at, inserted = row
+        return self._item_from_row(cart, product, item_id, new_quantity, created_at, now), inserted
+    
+    def _increment_or_create_item(self, cart, product, quantity):
+        """
+        F() based equivalent of _upsert_item for other databases: a
+        conditional UPDATE, then an INSERT if the line doesn't exist yet.
+        """
+        now = timezone.now()
+        for attempt in range(2):
+            stock = Product.objects.filter(pk=product.pk).values('stock_quantity')[:1]
+            lines = CartItem.objects.filter(cart=cart, product=product)
+            updated = lines.filter(quantity__lte=Subquery(stock) - quantity).update(
+                quantity=F('quantity') + quantity,
+                updated_at=now
+            )
+            if updated:
+                touch_cart(cart.pk)
+                cart_item = lines.get()
+                cart_item.product = product
+                return cart_item, False
+            if lines.exists():
+                return None, False
+            
+            try:
+                with transaction.atomic():
+                    # save() touches the cart
+                    return CartItem.objects.create(cart=cart, product=product, quantity=quantity), True
+            except IntegrityError:
+                continue  # Created concurrently - increment it instead
+        return None, False
+    
+    def _item_from_row(self, cart, product, item_id, quantity, created_at, updated_at):
+        cart_item = CartItem(
+            id=item_id,
+            cart=cart,
+            product=product,
+            quantity=quantity,
+            created_at=created_at,
+            updated_at=updated_at
+        )
+        cart_item._state.adding = False
+        return cart_item
+    
+    def get_item(self, user, item_id):
+        """Get a line of the user's cart (raises CartItem.DoesNotExist)"""
+        return CartItem.objects.select_related('product', 'cart').get(id=item_id, cart__user=user)
+
+    def update_item(self, user, cart_item, quantity):
+        cart_item.quantity = quantity
+        cart_item.save()
+        return cart_item
+
+    def remove_item(self, user, cart_item):
+        cart_item.delete()
+
+    def clear(self, user):
+        """Remove all lines; returns the number of units removed"""
+        try:
+            cart = Cart.objects.get(user=user)
+        except Cart.DoesNotExist:
+            return 0
+        items_count = cart.total_items
+        cart.clear()
+        return items_count
+
+    def apply_bulk(self, user, operations):
+        """
+        Apply bulk operations in one transaction with a fixed number of
+        queries: one product fetch, one bulk insert / update / delete each
+        and a single cart touch. Returns per-operation results.
+        """
+        with transaction.atomic():
+            cart = self.get_cart(user)
+            products = Product.objects.in_bulk({operation['product_id'] for operation in operations})
+            items = {item.product_id: item for item in cart.items.select_for_update()}
+            
+            results, changed = plan_bulk_changes(
+                {product_id: item.quantity for product_id, item in items.items()},
+                operations,
+                products
+            )
+            if not changed:
+                return results
+            
+            now = timezone.now()
+            created, updated, removed = [], [], []
+            for product_id, quantity in changed.items():
+                item = items.get(product_id)
+                if not quantity:
+                    removed.append(item.pk)
+                elif item is None:
+                    created.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+                else:
+                    item.quantity = quantity
+                    item.updated_at = now  # bulk_update skips auto_now
+                    updated.append(item)
+            
+            if removed:
+                CartItem.objects.filter(pk__in=removed).delete()
+            if created:
+                CartItem.objects.bulk_create(created)
+            if updated:
+                CartItem.objects.bulk_update(updated, ['quantity', 'updated_at'])
+            touch_cart(cart.pk)
+        return results
+    
+    def persist(self, user_id):
+        """Rows are already the source of truth"""
+
+    def discard(self, user_id, quantities=None):
+        """Nothing cached outside the database"""
+
+
+@lru_cache(maxsize=None)
+def get_redis_client(url):
+    return redis.Redis.from_url(url, decode_responses=True)
+
+
+def _timestamp_to_datetime(value):
+    return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+
+
+class RedisCartStore:
+    """
+    Cart lines kept in a Redis hash per user.
+
+    Hash fields: `_id`, `_created`, `_updated` for the cart itself and, per
+    product id, `q:<id>` (quantity), `i:<id>` (line id), `c:<id>` / `u:<id>`
+    (created / updated timestamps). A missing hash is seeded from the
+    database on first use. Users with unsaved changes are kept in a set for
+    write-back.
+    """
+    key_prefix = 'cart'
+    dirty_key = 'cart:dirty'
+
+    def __init__(self, client=None, ttl=None):
+        self.client = client or get_redis_client(settings.CART_REDIS_URL)
+        self.ttl = ttl if ttl is not None else settings.CART_REDIS_TTL
+
+    def _key(self, user_id):
+        return f'{self.key_prefix}:{user_id}'
+
+    def _read(self, user_id):
+        """Split the hash into cart metadata and {product_id: line} (None if missing)"""
+        data = self.client.hgetall(self._key(user_id))
+        if '_id' not in data:
+            return None, {}
+
+        lines = {}
+        for field, value in data.items():
+            if not field.startswith('q:') or int(value) <= 0:
+                continue
+            product_id = field[2:]
+            lines[product_id] = {
+                'quantity': int(value),
+                'id': data.get(f'i:{product_id}'),
+                'created_at': data.get(f'c:{product_id}', data['_created']),
+                'updated_at': data.get(f'u:{product_id}', data['_updated']),
+            }
+        return data, lines
+
+    def _ensure_loaded(self, user):
+        """Seed the user's hash from the database if Redis has no copy yet"""
+        key = self._key(user.pk)
+        if self.client.hexists(key, '_id'):
+            return key
+
+        now = time.time()
+        cart = Cart.objects.filter(user=user).first()
+        pipe = self.client.pipeline()
+        if cart is not None:
+            # HSETNX, so lines written by a concurrent request are kept
+            for item in cart.items.all():
+                pipe.hsetnx(key, f'q:{item.product_id}', item.quantity)
+                pipe.hsetnx(key, f'i:{item.product_id}', str(item.id))
+                pipe.hsetnx(key, f'c:{item.product_id}', item.created_at.timestamp())
+                pipe.hsetnx(key, f'u:{item.product_id}', item.updated_at.timestamp())
+        pipe.hsetnx(key, '_created', cart.created_at.timestamp() if cart else now)
+        pipe.hsetnx(key, '_updated', cart.updated_at.timestamp() if cart else now)
+        pipe.hsetnx(key, '_id', str(cart.id if cart else uuid.uuid4()))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        return key
+
+    def _touch(self, pipe, user_id, *product_ids):
+        """Queue timestamp, TTL and write-back bookkeeping for a change"""
+        now = time.time()
+        key = self._key(user_id)
+        pipe.hset(key, mapping={'_updated': now, **{f'u:{product_id}': now for product_id in product_ids}})
+        pipe.expire(key, self.ttl)
+        pipe.sadd(self.dirty_key, str(user_id))
+
+    def _build_cart(self, user, meta):
+        cart = Cart(
+            id=uuid.UUID(meta['_id']),
+            user=user,
+            created_at=_timestamp_to_datetime(meta['_created']),
+            updated_at=_timestamp_to_datetime(meta['_updated'])
+        )
+        cart._state.adding = False
+        return cart
+
+    def _build_item(self, cart, product, line):
+        return CartItem(
+            id=uuid.UUID(line['id']) if line['id'] else uuid.uuid4(),
+            cart=cart,
+            product=product,
+            quantity=line['quantity'],
+            created_at=_timestamp_to_datetime(line['created_at']),
+            updated_at=_timestamp_to_datetime(line['updated_at'])
+        )
+
+    def get_cart(self, user, with_items=False):
+        """Cart built from Redis; its items are served from the prefetch cache"""
+        self._ensure_loaded(user)
+        meta, lines = self._read(user.pk)
+        cart = self._build_cart(user, meta)
+
+        products = {str(pk): product for pk, product in Product.objects.in_bulk(list(lines)).items()}
+        items = [
+            self._build_item(cart, products[product_id], line)
+            for product_id, line in lines.items()
+            if product_id in products
+        ]
+        items.sort(key=lambda item: item.created_at, reverse=True)
+        cart._prefetched_objects_cache = {'items': items}
+
+        # Drop lines whose product was deleted
+        vanished = [product_id for product_id in lines if product_id not in products]
+        if vanished:
+            self._remove_lines(user.pk, vanished)
+        return cart
+
+    def add_item(self, user, product, quantity):
+        """Add `quantity` of `product` with HINCRBY; returns (cart_item, created)"""
+        key = self._ensure_loaded(user)
+        product_id = str(product.pk)
+
+        pipe = self.client.pipeline()
+        pipe.hincrby(key, f'q:{product_id}', quantity)
+        pipe.hsetnx(key, f'i:{product_id}', str(uuid.uuid4()))
+        pipe.hsetnx(key, f'c:{product_id}', time.time())
+        self._touch(pipe, user.pk, product_id)
+        new_quantity = pipe.execute()[0]
+
+        if new_quantity > product.stock_quantity:
+            self.client.hincrby(key, f'q:{product_id}', -quantity)
+            raise InsufficientStock(product.stock_quantity, new_quantity - quantity)
+
+        meta, lines = self._read(user.pk)
+        cart_item = self._build_item(self._build_cart(user, meta), product, lines[product_id])
+        return cart_item, new_quantity == quantity
+
+    def get_item(self, user, item_id):
+        """Find a line by its id (raises CartItem.DoesNotExist)"""
+        self._ensure_loaded(user)
+        meta, lines = self._read(user.pk)
+        for product_id, line in lines.items():
+            if line['id'] == str(item_id):
+                try:
+                    product = Product.objects.get(pk=product_id)
+                except Product.DoesNotExist:
+                    break
+                return self._build_item(self._build_cart(user, meta), product, line)
+        raise CartItem.DoesNotExist('Item not found in your cart')
+
+    def update_item(self, user, cart_item, quantity):
+        """
+        Set a line's quantity (raises CartItem.DoesNotExist)
+        
+        The line id is checked under WATCH, so a line removed since it was
+        read isn't recreated without its id and timestamps.
+        """
+        key = self._key(user.pk)
+        product_id = str(cart_item.product_id)
+
+        def set_quantity(pipe):
+            if pipe.hget(key, f'i:{product_id}') != str(cart_item.id):
+                raise CartItem.DoesNotExist('Item not found in your cart')
+            pipe.multi()
+            pipe.hset(key, f'q:{product_id}', quantity)
+            self._touch(pipe, user.pk, product_id)
+
+        self.client.transaction(set_quantity, key)
+        cart_item.quantity = quantity
+        return cart_item
+
+    def _remove_lines(self, user_id, product_ids):
+        fields = [f'{prefix}:{product_id}' for product_id in product_ids for prefix in 'qicu']
+        pipe = self.client.pipeline()
+        if fields:
+            pipe.hdel(self._key(user_id), *fields)
+        self._touch(pipe, user_id)
+        pipe.execute()
+
+    def remove_item(self, user, cart_item):
+        self._remove_lines(user.pk, [cart_item.product_id])
+
+    def clear(self, user):
+        """Remove all lines; returns the number of units removed"""
+        self._ensure_loaded(user)
+        meta, lines = self._read(user.pk)
+        self._remove_lines(user.pk, list(lines))
+        return sum(line['quantity'] for line in lines.values())
+
+    def apply_bulk(self, user, operations):
+        """Apply bulk operations with one product fetch and one Redis pipeline"""
+        self._ensure_loaded(user)
+        meta, lines = self._read(user.pk)
+        products = Product.objects.in_bulk({operation['product_id'] for operation in operations})
+        
+        results, changed = plan_bulk_changes(
+            {uuid.UUID(product_id): line['quantity'] for product_id, line in lines.items()},
+            operations,
+            products
+        )
+        if not changed:
+            return results
+        
+        key = self._key(user.pk)
+        now = time.time()
+        pipe = self.client.pipeline()
+        removed = []
+        for product_id, quantity in changed.items():
+            if not quantity:
+                removed.extend(f'{prefix}:{product_id}' for prefix in 'qicu')
+                continue
+            pipe.hset(key, f'q:{product_id}', quantity)
+            pipe.hsetnx(key, f'i:{product_id}', str(uuid.uuid4()))
+            pipe.hsetnx(key, f'c:{product_id}', now)
+        if removed:
+            pipe.hdel(key, *removed)
+        self._touch(pipe, user.pk, *(product_id for product_id, quantity in changed.items() if quantity))
+        pipe.execute()
+        return results
+    
+    def persist(self, user_id):
+        """Write the user's Redis cart back to Cart / CartItem"""
+        self.client.srem(self.dirty_key, str(user_id))
+        meta, lines = self._read(user_id)
+        if meta is None:
+            return
+
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user_id=user_id, defaults={'id': meta['_id']})
+            product_ids = set(
+                str(pk) for pk in Product.objects.filter(pk__in=list(lines)).values_list('pk', flat=True)
+            )
+            cart.items.exclude(product_id__in=product_ids).delete()
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(
+                        id=line['id'] or uuid.uuid4(),
+                        cart=cart,
+                        product_id=product_id,
+                        quantity=line['quantity']
+                    )
+                    for product_id, line in lines.items()
+                    if product_id in product_ids
+                ],
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity', 'updated_at']
+            )
+            Cart.objects.filter(pk=cart.pk).update(updated_at=_timestamp_to_datetime(meta['_updated']))
+
+    def persist_dirty(self, batch_size=500):
+        """Write back up to `batch_size` changed carts; returns how many were written"""
+        user_ids = self.client.spop(self.dirty_key, batch_size) or []
+        persisted = 0
+        for user_id in user_ids:
+            try:
+                self.persist(user_id)
+                persisted += 1
+            except Exception as e:
+                # Keep it queued for the next run
+                logger.error(f"Failed to persist cart for user {user_id}: {str(e)}")
+                self.client.sadd(self.dirty_key, user_id)
+        return persisted
+
+    def discard(self, user_id, quantities=None):
+        """
+        Forget checked-out lines of the Redis copy (after checkout emptied
+        the database cart).
+        
+        Args:
+            user_id: The cart's user
+            quantities: {product_id: quantity} that was checked out; only
+                these units are removed, so lines added since the cart was
+                written back survive (default: forget the whole cart)
+        """
+        key = self._key(user_id)
+        if quantities is None:
+            pipe = self.client.pipeline()
+            pipe.delete(key)
+            pipe.srem(self.dirty_key, str(user_id))
+            pipe.execute()
+            return
+
+        checked_out = {str(product_id): quantity for product_id, quantity in quantities.items()}
+
+        def remove_checked_out(pipe):
+            in_cart = {
+                field[2:]: int(value)
+                for field, value in pipe.hgetall(key).items()
+                if field.startswith('q:') and int(value) > 0
+            }
+            removed, kept = [], {}
+            for product_id, quantity in checked_out.items():
+                if product_id not in in_cart:
+                    continue
+                in_cart[product_id] -= quantity
+                if in_cart[product_id] > 0:
+                    kept[f'q:{product_id}'] = in_cart[product_id]
+                else:
+                    removed.extend(f'{prefix}:{product_id}' for prefix in 'qicu')
+
+            pipe.multi()
+            if not any(quantity > 0 for quantity in in_cart.values()):
+                pipe.delete(key)
+                pipe.srem(self.dirty_key, str(user_id))
+                return
+            if removed:
+                pipe.hdel(key, *removed)
+            if kept:
+                pipe.hset(key, mapping=kept)
+            # The database cart was emptied; write what's left back to it
+            self._touch(pipe, user_id)
+
+        self.client.transaction(remove_checked_out, key)
+
+
+def get_cart_store():
+    """Cart store for the configured CART_BACKEND ('database' or 'redis')"""
+    if getattr(settings, 'CART_BACKEND', 'database') == 'redis':
+        return RedisCartStore()
+    return DatabaseCartStore()
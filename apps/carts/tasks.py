@@ -0,0 +1,36 @@
+# apps/carts/tasks.py
+
+"""
+Celery Tasks for Carts
+
+Write-back of carts held in Redis (CART_BACKEND=redis) to the database.
+"""
+
+from celery import shared_task
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def persist_dirty_carts(batch_size=500):
+    """
+    Write carts changed in Redis back to Cart / CartItem.
+    This task should be run periodically (e.g., every minute).
+    
+    Args:
+        batch_size (int): Maximum number of carts written per run
+    
+    Returns:
+        int: Number of carts written
+    """
+    if getattr(settings, 'CART_BACKEND', 'database') != 'redis':
+        return 0
+    
+    from .store import RedisCartStore
+    
+    persisted = RedisCartStore().persist_dirty(batch_size)
+    if persisted:
+        logger.info(f"Persisted {persisted} carts from Redis")
+    return persisted
@@ -1,3 +1,364 @@
-from django.test import TestCase
+# apps/carts/tests.py
 
-# Create your tests here.
+"""
+Cart Tests
+"""
+
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.products.models import Product
+from apps.products.testing import create_products
+from .models import Cart, CartItem, coalesce_cart_touches
+from .store import DatabaseCartStore, InsufficientStock, RedisCartStore, get_redis_client
+
+User = get_user_model()
+
+
+class CartSummaryTests(TestCase):
+    """Cart totals come from one aggregate query"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='shopper@example.com', password='pass12345')
+        self.cart = Cart.objects.create(user=self.user)
+
+    def test_totals_in_one_query(self):
+        discounted, regular = create_products(2, compare_price=Decimal('15.00'))
+        regular.compare_price = None
+        regular.save()
+        CartItem.objects.create(cart=self.cart, product=discounted, quantity=2)  # 2 x 10, compare 2 x 15
+        CartItem.objects.create(cart=self.cart, product=regular, quantity=3)     # 3 x 11, no compare price
+
+        cart = Cart.objects.get(pk=self.cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.total_items, 5)
+            self.assertEqual(cart.total_price, Decimal('53.00'))
+            self.assertEqual(cart.total_compare_price, Decimal('63.00'))
+            self.assertEqual(cart.total_savings, Decimal('10.00'))
+
+    def test_empty_cart_totals_are_zero(self):
+        self.assertEqual(self.cart.total_items, 0)
+        self.assertEqual(self.cart.total_price, Decimal('0.00'))
+        self.assertEqual(self.cart.total_savings, Decimal('0.00'))
+
+    def test_clear_resets_summary(self):
+        product = create_products(1)[0]
+        CartItem.objects.create(cart=self.cart, product=product, quantity=4)
+        self.assertEqual(self.cart.total_items, 4)
+        self.cart.clear()
+        self.assertEqual(self.cart.total_items, 0)
+
+
+class CartViewQueryCountTests(TestCase):
+    """GET /carts/ renders any cart in a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(200)
+        for index, product in enumerate(cls.products[:3]):
+            product.images.create(image=f'products/cart-{index}.jpg', is_primary=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='shopper@example.com', password='pass12345')
+        self.cart = Cart.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('carts:cart-operations')
+
+    def _get_cart(self, item_count):
+        self.cart.items.all().delete()
+        CartItem.objects.bulk_create(
+            CartItem(cart=self.cart, product=product, quantity=2)
+            for product in self.products[:item_count]
+        )
+        # Cart lookup + items joined with their products
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_query_budget_is_the_same_for_1_and_200_items(self):
+        small = self._get_cart(1)
+        self.assertEqual(len(small['items']), 1)
+
+        large = self._get_cart(200)
+        self.assertEqual(len(large['items']), 200)
+        self.assertEqual(large['total_items'], 400)
+        expected_total = sum(product.price * 2 for product in self.products)
+        self.assertEqual(Decimal(large['total_price']), expected_total)
+
+        images = [item['product_image'] for item in large['items'] if item['product_image']]
+        self.assertEqual(len(images), 3)
+
+
+def redis_available():
+    try:
+        return get_redis_client(settings.CART_REDIS_URL).ping()
+    except Exception:
+        return False
+
+
+class CartApiTestMixin:
+    """Authenticated client plus shortcuts for the cart endpoints"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='shopper@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('carts:cart-operations')
+        self.laptop, self.phone = create_products(2, stock_quantity=5)
+
+    def _add(self, product, quantity):
+        return self.client.post(self.url, {'product_id': str(product.pk), 'quantity': quantity}, format='json', secure=True)
+
+    def _cart(self):
+        return self.client.get(self.url, secure=True).json()['data']
+
+    def _item_url(self, item_id):
+        return reverse('carts:cart-item-operations', args=[item_id])
+
+    def exercise_cart_flow(self):
+        self.assertEqual(self._add(self.laptop, 2).status_code, 201)
+        self.assertEqual(self._add(self.laptop, 1).status_code, 200)
+        self.assertEqual(self._add(self.laptop, 3).status_code, 400)  # 6 > stock of 5
+        self.assertEqual(self._add(self.phone, 1).status_code, 201)
+
+        cart = self._cart()
+        self.assertEqual(cart['total_items'], 4)
+        items = {item['product_id']: item for item in cart['items']}
+        self.assertEqual(items[str(self.laptop.pk)]['quantity'], 3)
+
+        phone_item = items[str(self.phone.pk)]['id']
+        response = self.client.put(self._item_url(phone_item), {'quantity': 4}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._cart()['total_items'], 7)
+
+        self.assertEqual(self.client.delete(self._item_url(phone_item), secure=True).status_code, 200)
+        self.assertEqual(self.client.delete(self._item_url(phone_item), secure=True).status_code, 404)
+        self.assertEqual(self._cart()['total_items'], 3)
+
+        response = self.client.delete(self.url, secure=True)
+        self.assertEqual(response.json()['data']['cleared_items'], 3)
+        self.assertEqual(self._cart()['items'], [])
+
+
+    def exercise_bulk_flow(self):
+        self._add(self.laptop, 1)
+        response = self.client.post(reverse('carts:cart-bulk'), {'items': [
+            {'product_id': str(self.laptop.pk), 'op': 'add', 'quantity': 2},
+            {'product_id': str(self.phone.pk), 'op': 'set', 'quantity': 4},
+            {'product_id': str(self.phone.pk), 'op': 'add', 'quantity': 2},  # 6 > stock of 5
+        ]}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([result['success'] for result in data['results']], [True, True, False])
+        self.assertEqual(data['cart']['total_items'], 7)
+
+        response = self.client.post(reverse('carts:cart-bulk'), {'items': [
+            {'product_id': str(self.laptop.pk), 'op': 'remove'},
+            {'product_id': str(self.phone.pk), 'op': 'set', 'quantity': 1},
+        ]}, format='json', secure=True)
+        cart = response.json()['data']['cart']
+        self.assertEqual([item['product_id'] for item in cart['items']], [str(self.phone.pk)])
+        self.assertEqual(cart['total_items'], 1)
+
+
+class DatabaseCartStoreTests(CartApiTestMixin, TestCase):
+    """Cart endpoints with the default database store"""
+
+    def test_cart_flow(self):
+        self.exercise_cart_flow()
+
+    def test_bulk_flow(self):
+        self.exercise_bulk_flow()
+
+    def test_bulk_query_count_does_not_grow_with_lines(self):
+        products = create_products(30, prefix='Bulk Product')
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product) for product in products[:2])
+        url = reverse('carts:cart-bulk')
+
+        def bulk(products):
+            # Each request updates one existing line and creates the rest
+            items = [{'product_id': str(product.pk), 'quantity': 1} for product in products]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(url, {'items': items}, format='json', secure=True)
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        self.assertEqual(bulk(products[0:1] + products[2:3]), bulk(products[1:2] + products[3:]))
+
+    def test_bulk_rejects_invalid_lines(self):
+        response = self.client.post(reverse('carts:cart-bulk'), {'items': [
+            {'product_id': str(self.laptop.pk), 'op': 'add'},
+        ]}, format='json', secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(redis_available(), 'Redis is not reachable at CART_REDIS_URL')
+@override_settings(CART_BACKEND='redis')
+class RedisCartStoreTests(CartApiTestMixin, TestCase):
+    """Cart endpoints with the Redis store and its write-back"""
+
+    def setUp(self):
+        super().setUp()
+        self.store = RedisCartStore()
+        self.store.discard(self.user.pk)
+        self.addCleanup(self.store.discard, self.user.pk)
+
+    def test_cart_flow(self):
+        self.exercise_cart_flow()
+        # Nothing was written to the cart tables
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_bulk_flow(self):
+        self.exercise_bulk_flow()
+
+    def test_write_back(self):
+        self._add(self.laptop, 2)
+        self._add(self.phone, 1)
+        self.assertGreaterEqual(self.store.persist_dirty(), 1)
+        quantities = dict(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.laptop.pk: 2, self.phone.pk: 1})
+
+        # Line ids survive the round trip
+        item_ids = {item['id'] for item in self._cart()['items']}
+        self.assertEqual(item_ids, {str(pk) for pk in CartItem.objects.values_list('id', flat=True)})
+
+        self.client.delete(self.url, secure=True)
+        self.store.persist(self.user.pk)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_update_does_not_recreate_a_removed_line(self):
+        self._add(self.laptop, 2)
+        cart_item = self.store.get_item(self.user, self._cart()['items'][0]['id'])
+        self.store.remove_item(self.user, cart_item)
+
+        with self.assertRaises(CartItem.DoesNotExist):
+            self.store.update_item(self.user, cart_item, 3)
+        self.assertEqual(self._cart()['items'], [])
+
+    def test_checkout_keeps_lines_added_after_write_back(self):
+        self._add(self.laptop, 2)
+        self.store.persist(self.user.pk)
+
+        # Added while the order is being placed
+        self._add(self.laptop, 1)
+        self._add(self.phone, 1)
+        self.store.discard(self.user.pk, {self.laptop.pk: 2})
+
+        items = {item['product_id']: item['quantity'] for item in self._cart()['items']}
+        self.assertEqual(items, {str(self.laptop.pk): 1, str(self.phone.pk): 1})
+
+        self.store.discard(self.user.pk, {self.laptop.pk: 1, self.phone.pk: 1})
+        self.assertFalse(self.store.client.exists(self.store._key(self.user.pk)))
+
+    def test_cart_is_seeded_from_database(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.laptop, quantity=2)
+        self.assertEqual(self._cart()['total_items'], 2)
+        self._add(self.laptop, 1)
+        self.assertEqual(self._cart()['total_items'], 3)
+
+
+class AtomicAddToCartTests(TestCase):
+    """DatabaseCartStore.add_item increments in the database against live stock"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='shopper@example.com', password='pass12345')
+        self.product = create_products(1, stock_quantity=5)[0]
+        self.store = DatabaseCartStore()
+
+    def test_increments_return_the_new_quantity(self):
+        item, created = self.store.add_item(self.user, self.product, 2)
+        self.assertTrue(created)
+        item, created = self.store.add_item(self.user, self.product, 3)
+        self.assertFalse(created)
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_stock_is_checked_in_the_database(self):
+        self.store.add_item(self.user, self.product, 2)
+        # Stock dropped after the request loaded the product
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=3)
+        with self.assertRaises(InsufficientStock) as context:
+            self.store.add_item(self.user, self.product, 2)
+        self.assertEqual((context.exception.available, context.exception.in_cart), (3, 2))
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+
+
+class CartTouchTests(TestCase):
+    """Cart.updated_at writes are coalesced to one UPDATE per transaction"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='shopper@example.com', password='pass12345')
+        self.cart = Cart.objects.create(user=self.user)
+        self.products = create_products(3)
+
+    def _cart_updates(self, context):
+        return [query for query in context.captured_queries if query['sql'].startswith('UPDATE "carts_cart"')]
+
+    def test_item_writes_in_one_block_touch_the_cart_once(self):
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                with coalesce_cart_touches():
+                    for product in self.products:
+                        CartItem.objects.create(cart=self.cart, product=product)
+                    CartItem.objects.filter(cart=self.cart).first().delete()
+        self.assertEqual(len(self._cart_updates(context)), 1)
+
+    def test_rolled_back_block_touches_nothing(self):
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(ValueError), coalesce_cart_touches():
+                    CartItem.objects.create(cart=self.cart, product=self.products[0])
+                    raise ValueError
+                with coalesce_cart_touches():
+                    CartItem.objects.create(cart=self.cart, product=self.products[1])
+        self.assertEqual(len(self._cart_updates(context)), 1)
+        self.assertEqual(list(self.cart.items.values_list('product', flat=True)), [self.products[1].pk])
+
+    def test_multi_write_request_touches_the_cart_once(self):
+        items = [CartItem.objects.create(cart=self.cart, product=product) for product in self.products]
+
+        def remove_item(store, user, cart_item):
+            # A removal that also rewrites the remaining lines one by one
+            cart_item.delete()
+            for item in CartItem.objects.filter(cart=cart_item.cart_id):
+                item.quantity += 1
+                item.save()
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('carts:cart-item-operations', args=[items[0].pk])
+        with mock.patch.object(DatabaseCartStore, 'remove_item', remove_item):
+            with CaptureQueriesContext(connection) as context:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = client.delete(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._cart_updates(context)), 1)
+        self.assertEqual(sorted(self.cart.items.values_list('quantity', flat=True)), [2, 2])
+
+    def test_touch_updates_the_timestamp(self):
+        before = self.cart.updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.create(cart=self.cart, product=self.products[0])
+        self.cart.refresh_from_db()
+        self.assertGreater(self.cart.updated_at, before)
+
+    def test_clear_is_one_delete_and_one_update(self):
+        CartItem.objects.bulk_create(CartItem(cart=self.cart, product=product) for product in self.products)
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.cart.clear()
+        statements = [query['sql'].split()[0] for query in context.captured_queries]
+        self.assertEqual(statements.count('DELETE'), 1)
+        self.assertEqual(len(self._cart_updates(context)), 1)
+        self.assertFalse(self.cart.items.exists())
@@ -13,6 +13,7 @@ from django.urls import path
 from .views import (
     CartView,
     CartItemView,
+    CartBulkView,
 )
 
 app_name = 'carts'
@@ -25,6 +26,9 @@ urlpatterns = [
     # Main cart endpoint - handles GET, POST (add), DELETE (clear)
     path('', CartView.as_view(), name='cart-operations'),
     
+    # Bulk cart changes - list of {product_id, op, quantity}
+    path('bulk/', CartBulkView.as_view(), name='cart-bulk'),
+    
     # Individual cart item endpoint - handles PUT, PATCH, DELETE
     path('<uuid:item_id>/', CartItemView.as_view(), name='cart-item-operations'),
 ]
@@ -40,6 +44,9 @@ ENDPOINT: /api/v1/carts/
 ├── POST    → Add product to cart  
 └── DELETE  → Clear entire cart
 
+ENDPOINT: /api/v1/carts/bulk/
+└── POST    → Apply several add/set/remove changes at once
+
 ENDPOINT: /api/v1/carts/{item_id}/
 ├── PUT     → Update item quantity
 ├── PATCH   → Partial update item quantity
@@ -13,18 +13,18 @@ from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
 from django.db import transaction
 
-from .models import Cart, CartItem
+from .models import CartItem, coalesce_cart_touches
+from .store import InsufficientStock, get_cart_store
 from .serializers import (
     CartSerializer,
     AddToCartSerializer,
     UpdateCartItemSerializer,
-    CartItemSerializer
+    CartItemSerializer,
+    BulkCartSerializer
 )
-from apps.products.models import Product
 
 
 class CartView(APIView):
@@ -38,10 +38,8 @@ class CartView(APIView):
     
     permission_classes = [IsAuthenticated]
     
-    def get_user_cart(self):
-        """Get or create user's cart"""
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+    def get_cart_store(self):
+        return get_cart_store()
     
     @extend_schema(
         summary="Get user's cart",
@@ -52,7 +50,7 @@ class CartView(APIView):
     def get(self, request):
         """Handle cart retrieval request"""
         try:
-            cart = self.get_user_cart()
+            cart = self.get_cart_store().get_cart(request.user, with_items=True)
             serializer = CartSerializer(cart, context={'request': request})
             
             return Response({
@@ -91,31 +89,19 @@ class CartView(APIView):
             product = validated_data['product']
             quantity = validated_data['quantity']
             
-            # Get or create user's cart
-            cart = self.get_user_cart()
-            
-            # Check if item already exists in cart
-            cart_item, item_created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': quantity}
-            )
+            # Add to the user's cart (creates the line or increments its quantity)
+            try:
+                with coalesce_cart_touches():
+                    cart_item, item_created = self.get_cart_store().add_item(request.user, product, quantity)
+            except InsufficientStock as e:
+                return Response({
+                    'success': False,
+                    'message': 'Insufficient stock',
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             if not item_created:
-                # Item exists, update quantity
-                new_quantity = cart_item.quantity + quantity
-                
-                # Check stock availability for new quantity
-                if new_quantity > product.stock_quantity:
-                    return Response({
-                        'success': False,
-                        'message': 'Insufficient stock',
-                        'error': f'Only {product.stock_quantity} items available. You have {cart_item.quantity} in cart.'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                cart_item.quantity = new_quantity
-                cart_item.save()
-                message = f'Updated quantity to {new_quantity}'
+                message = f'Updated quantity to {cart_item.quantity}'
                 status_code = status.HTTP_200_OK
             else:
                 message = f'Added {quantity} item(s) to cart'
@@ -145,23 +131,10 @@ class CartView(APIView):
     def delete(self, request):
         """Handle clear cart request"""
         try:
-            # Get user's cart
-            try:
-                cart = Cart.objects.get(user=request.user)
-                items_count = cart.total_items
-                
-                # Clear all items
-                cart.clear()
-                
-                return Response({
-                    'success': True,
-                    'message': f'Removed {items_count} items from cart',
-                    'data': {
-                        'cleared_items': items_count
-                    }
-                })
-                
-            except Cart.DoesNotExist:
+            with coalesce_cart_touches():
+                items_count = self.get_cart_store().clear(request.user)
+            
+            if not items_count:
                 return Response({
                     'success': True,
                     'message': 'Cart is already empty',
@@ -170,6 +143,14 @@ class CartView(APIView):
                     }
                 })
             
+            return Response({
+                'success': True,
+                'message': f'Removed {items_count} items from cart',
+                'data': {
+                    'cleared_items': items_count
+                }
+            })
+            
         except Exception as e:
             return Response({
                 'success': False,
@@ -178,6 +159,66 @@ class CartView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class CartBulkView(APIView):
+    """
+    POST /carts/bulk/ - Apply several cart changes in one request
+    
+    Used to re-sync a cart (offline changes, guest cart merge). Operations
+    are applied in order in one transaction; each gets its own result.
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    @extend_schema(
+        summary="Bulk update cart",
+        description="""
+        Apply a list of cart changes in one request. Each item has a product_id, an op and a quantity:
+        
+        - add: add quantity to the line (default)
+        - set: set the line quantity (0 removes it)
+        - remove: remove the line
+        
+        Lines that fail validation (inactive product, insufficient stock) are reported in
+        `results` and leave that line unchanged; the others are still applied.
+        """,
+        request=BulkCartSerializer,
+        responses={200: CartSerializer},
+        tags=['Cart']
+    )
+    def post(self, request):
+        """Handle bulk cart request"""
+        serializer = BulkCartSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Validation failed',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            store = get_cart_store()
+            with coalesce_cart_touches():
+                results = store.apply_bulk(request.user, serializer.validated_data['items'])
+            cart = store.get_cart(request.user, with_items=True)
+            
+            applied = sum(1 for result in results if result['success'])
+            return Response({
+                'success': True,
+                'message': f'Applied {applied} of {len(results)} cart changes',
+                'data': {
+                    'results': results,
+                    'cart': CartSerializer(cart, context={'request': request}).data
+                }
+            })
+            
+        except Exception as e:
+            return Response({
+                'success': False,
+                'message': 'Failed to update cart',
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class CartItemView(APIView):
     """
     PUT /carts/update/{item_id}/ - Update cart item quantity
@@ -188,13 +229,12 @@ class CartItemView(APIView):
     
     permission_classes = [IsAuthenticated]
     
+    def get_cart_store(self):
+        return get_cart_store()
+    
     def get_cart_item(self, item_id):
-        """Get cart item for current user"""
-        return get_object_or_404(
-            CartItem.objects.select_related('product', 'cart'),
-            id=item_id,
-            cart__user=self.request.user
-        )
+        """Get cart item for current user (raises CartItem.DoesNotExist)"""
+        return self.get_cart_store().get_item(self.request.user, item_id)
     
     @extend_schema(
         summary="Update cart item quantity",
@@ -223,8 +263,8 @@ class CartItemView(APIView):
             new_quantity = serializer.validated_data['quantity']
             
             # Update quantity
-            cart_item.quantity = new_quantity
-            cart_item.save()
+            with coalesce_cart_touches():
+                cart_item = self.get_cart_store().update_item(request.user, cart_item, new_quantity)
             
             # Return updated cart item data
             response_serializer = CartItemSerializer(cart_item, context={'request': request})
@@ -272,7 +312,8 @@ class CartItemView(APIView):
             quantity = cart_item.quantity
             
             # Remove the item
-            cart_item.delete()
+            with coalesce_cart_touches():
+                self.get_cart_store().remove_item(request.user, cart_item)
             
             return Response({
                 'success': True,
@@ -1,3 +1,35 @@
+import time
+from unittest import mock
+
 from django.test import TestCase
+from kombu.exceptions import OperationalError
+
+from .utils import enqueue_on_commit
+
+
+class EnqueueOnCommitTests(TestCase):
+    """Tasks are queued after commit and run inline if the broker is down"""
+
+    def test_task_is_published_once_without_retries(self):
+        task = mock.Mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit(task, 'a', 1, flag=True)
+
+        task.apply_async.assert_called_once_with(
+            args=('a', 1), kwargs={'flag': True}, retry=False, ignore_result=True
+        )
+        task.apply.assert_not_called()
+
+    def test_unreachable_broker_runs_task_inline(self):
+        task = mock.Mock()
+        task.apply_async.side_effect = OperationalError('Error 111 connecting to localhost:6379')
+
+        started = time.monotonic()
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit(task, 'a', flag=True)
+        elapsed = time.monotonic() - started
+
+        task.apply.assert_called_once_with(args=('a',), kwargs={'flag': True})
+        self.assertLess(elapsed, 1)
 
-# Create your tests here.
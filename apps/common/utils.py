@@ -8,6 +8,7 @@ This module contains utility functions used across the application.
 
 import hashlib
 import hmac
+import logging
 import secrets
 import string
 from datetime import datetime, timedelta
@@ -15,9 +16,12 @@ from typing import Optional, Dict, Any
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.db import transaction
 from django.utils.html import strip_tags
 import jwt
 
+logger = logging.getLogger(__name__)
+
 
 def generate_random_string(length=32, include_punctuation=False):
     """
@@ -223,4 +227,28 @@ def format_currency(amount: float, currency: str = 'USD') -> str:
     }
     
     symbol = currency_symbols.get(currency, currency)
-    return f"{symbol}{amount:,.2f}"
\ No newline at end of file
+    return f"{symbol}{amount:,.2f}"
+
+
+def enqueue_on_commit(task, *args, **kwargs):
+    """
+    Queue a Celery task once the current transaction commits.
+    
+    Workers never see uncommitted rows, and nothing is queued if the
+    transaction rolls back. The task is published once, without retries
+    or a result subscription, so if the broker can't be reached it fails
+    within CELERY_BROKER_CONNECTION_TIMEOUT and runs inline instead of
+    being lost.
+    
+    Args:
+        task: Celery task (shared_task)
+        *args, **kwargs: Task arguments (must be JSON serializable)
+    """
+    def enqueue():
+        try:
+            task.apply_async(args=args, kwargs=kwargs, retry=False, ignore_result=True)
+        except Exception as e:
+            logger.warning(f"Could not queue {task.name}, running inline: {str(e)}")
+            task.apply(args=args, kwargs=kwargs)
+    
+    transaction.on_commit(enqueue)
@@ -5,7 +5,7 @@ Order Admin Configuration
 """
 
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, StockReservation
 
 
 class OrderItemInline(admin.TabularInline):
@@ -25,7 +25,7 @@ class OrderAdmin(admin.ModelAdmin):
         'user',
         'status',
         'total_amount',
-        'total_items',
+        'item_count',
         'created_at'
     ]
     
@@ -45,13 +45,15 @@ class OrderAdmin(admin.ModelAdmin):
         'user',
         'subtotal',
         'total_amount',
+        'item_count',
+        'line_summary',
         'created_at',
         'updated_at'
     ]
     
     fieldsets = (
         ('Order Information', {
-            'fields': ('id', 'user', 'status', 'subtotal', 'total_amount')
+            'fields': ('id', 'user', 'status', 'subtotal', 'total_amount', 'item_count', 'line_summary')
         }),
         ('Shipping Details', {
             'fields': ('shipping_address', 'shipping_city', 'shipping_country', 'shipping_postal_code')
@@ -69,7 +71,7 @@ class OrderAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         """Optimize queryset"""
-        return super().get_queryset(request).select_related('user').prefetch_related('items')
+        return super().get_queryset(request).select_related('user')
 
 
 @admin.register(OrderItem)
@@ -79,4 +81,14 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['order', 'product_name', 'quantity', 'unit_price', 'subtotal']
     list_filter = ['created_at']
     search_fields = ['product_name', 'product_sku', 'order__id']
-    readonly_fields = ['order', 'product', 'created_at']
\ No newline at end of file
+    readonly_fields = ['order', 'product', 'created_at']
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """Admin for stock held by unpaid orders"""
+    
+    list_display = ['order', 'product', 'quantity', 'expires_at']
+    list_filter = ['expires_at']
+    search_fields = ['order__id', 'product__name']
+    readonly_fields = ['order', 'product', 'quantity', 'created_at']
+    list_select_related = ['order__user', 'product']
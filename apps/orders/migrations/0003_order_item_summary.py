@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+def summarize_orders(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    batch = []
+    for order in Order.objects.prefetch_related('items').iterator(chunk_size=500):
+        items = list(order.items.all())
+        order.item_count = sum(item.quantity for item in items)
+        order.line_summary = [
+            {'product_id': str(item.product_id), 'name': item.product_name, 'quantity': item.quantity}
+            for item in items
+        ]
+        batch.append(order)
+        if len(batch) == 500:
+            Order.objects.bulk_update(batch, ['item_count', 'line_summary'])
+            batch = []
+    Order.objects.bulk_update(batch, ['item_count', 'line_summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='line_summary',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(summarize_orders, migrations.RunPython.noop),
+    ]
@@ -7,13 +7,34 @@ Models for handling e-commerce orders.
 """
 
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from apps.products.models import Product
 
 
+class InvalidTransition(Exception):
+    """An order's status doesn't allow the requested status change"""
+    
+    def __init__(self, current, status):
+        self.current = current
+        self.status = status
+        super().__init__(f"Cannot change status from '{self.current_display}' to '{status}'")
+    
+    @property
+    def current_display(self):
+        return dict(Order.STATUS_CHOICES).get(self.current, self.current)
+
+
 class Order(models.Model):
-    """Order Model"""
+    """
+    Order Model
+    
+    Status changes should go through the state machine below
+    (STATUS_TRANSITIONS, transition_to / transition / bulk_transition)
+    rather than save(), so they are checked, race-free and apply their
+    side effects.
+    """
     
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -23,6 +44,15 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Statuses an order may move to from each status
+    STATUS_TRANSITIONS = {
+        'pending': ['processing', 'cancelled'],
+        'processing': ['shipped', 'cancelled'],
+        'shipped': ['delivered', 'cancelled'],
+        'delivered': [],  # Final state
+        'cancelled': []   # Final state
+    }
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -40,6 +70,11 @@ class Order(models.Model):
     # Notes
     order_notes = models.TextField(blank=True)
     
+    # Summary of the items, written once at checkout so lists, admin and
+    # payments never read OrderItem for it
+    item_count = models.PositiveIntegerField(default=0)
+    line_summary = models.JSONField(default=list, blank=True)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -54,10 +89,120 @@ class Order(models.Model):
     def __str__(self):
         return f"Order {str(self.id)[:8]} - {self.user.email}"
     
+    @classmethod
+    def statuses_allowing(cls, status, from_statuses=None):
+        """Statuses from which an order may move to `status` (limited to `from_statuses`)"""
+        return [
+            source for source, targets in cls.STATUS_TRANSITIONS.items()
+            if status in targets and (from_statuses is None or source in from_statuses)
+        ]
+    
+    def can_transition_to(self, status):
+        return status in self.STATUS_TRANSITIONS.get(self.status, [])
+    
+    @classmethod
+    def _after_transition(cls, order_ids, status):
+        """Side effects of a status change, run in the same transaction"""
+        if status == 'cancelled':
+            from .reservations import restore_order_stock
+            restore_order_stock(order_ids)
+    
+    @classmethod
+    def transition(cls, order_id, status, from_statuses=None):
+        """
+        Move an order to `status` without reading it first.
+        
+        One UPDATE ... WHERE id = ? AND status IN (statuses allowing the
+        move), so of two concurrent writers only one can win.
+        
+        Returns:
+            bool: True if the order moved
+        """
+        sources = cls.statuses_allowing(status, from_statuses)
+        with transaction.atomic():
+            moved = cls.objects.filter(pk=order_id, status__in=sources).update(
+                status=status,
+                updated_at=timezone.now()
+            )
+            if moved:
+                cls._after_transition([order_id], status)
+        return bool(moved)
+    
+    def transition_to(self, status, from_statuses=None):
+        """
+        Compare-and-swap this order from its current status to `status`.
+        
+        The UPDATE only matches while the row still has the status held by
+        this instance. If another writer got there first, the status is
+        re-read and the move retried when it is still allowed.
+        
+        Raises:
+            InvalidTransition: The order's status doesn't allow the move
+        """
+        sources = self.statuses_allowing(status, from_statuses)
+        while True:
+            if self.status not in sources:
+                raise InvalidTransition(self.status, status)
+            
+            now = timezone.now()
+            with transaction.atomic():
+                moved = type(self).objects.filter(pk=self.pk, status=self.status).update(
+                    status=status,
+                    updated_at=now
+                )
+                if moved:
+                    type(self)._after_transition([self.pk], status)
+            if moved:
+                self.status, self.updated_at = status, now
+                return
+            
+            current = type(self).objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            if current is None:
+                raise Order.DoesNotExist
+            self.status = current
+    
+    @classmethod
+    def bulk_transition(cls, order_ids, status, from_statuses=None, skip_locked=False):
+        """
+        Move every order that allows it to `status` with one conditional UPDATE.
+        
+        The orders are read (and locked) in one query, so the outcome for
+        each id is exact. With skip_locked, orders locked by another
+        transaction are left out, as if they didn't exist.
+        
+        Returns:
+            tuple: ({order id: status before}, [ids moved to `status`]);
+            ids that don't exist are missing from both
+        """
+        sources = cls.statuses_allowing(status, from_statuses)
+        with transaction.atomic():
+            previous = dict(
+                cls.objects.select_for_update(skip_locked=skip_locked)
+                .filter(pk__in=order_ids)
+                .values_list('pk', 'status')
+            )
+            moved = [pk for pk, current in previous.items() if current in sources]
+            if moved:
+                cls.objects.filter(pk__in=moved, status__in=sources).update(status=status, updated_at=timezone.now())
+                cls._after_transition(moved, status)
+        return previous, moved
+    
     @property
     def total_items(self):
         """Get total number of items in order"""
-        return sum(item.quantity for item in self.items.all())
+        return self.item_count
+    
+    def summarize_items(self, items):
+        """
+        Fill item_count and line_summary from the order's items.
+        
+        line_summary is a compact list of {product_id, name, quantity}.
+        """
+        self.item_count = sum(item.quantity for item in items)
+        self.line_summary = [
+            {'product_id': str(item.product_id), 'name': item.product_name, 'quantity': item.quantity}
+            for item in items
+        ]
 
 
 class OrderItem(models.Model):
@@ -87,4 +232,31 @@ class OrderItem(models.Model):
     def save(self, *args, **kwargs):
         # Auto-calculate subtotal
         self.subtotal = self.unit_price * self.quantity
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class StockReservation(models.Model):
+    """
+    Stock held by an unpaid order.
+    
+    The units were already taken from Product.stock_quantity at checkout.
+    Payment (or cancellation) deletes the hold; if neither happens before
+    expires_at, release_expired_reservations gives the stock back and
+    cancels the order.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['expires_at']
+        indexes = [
+            models.Index(fields=['expires_at']),
+            models.Index(fields=['product', 'expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held for order {str(self.order_id)[:8]}"
@@ -0,0 +1,20 @@
+# apps/orders/pagination.py
+
+"""
+Pagination Configuration
+
+Pagination classes for order APIs.
+"""
+
+from apps.products.pagination import KeysetPagination
+
+
+class OrderHistoryPagination(KeysetPagination):
+    """
+    Keyset pagination for a user's order history over (-created_at, id)
+
+    Served by the (user, -created_at) index; deep pages of a long history
+    cost the same as the first one.
+    """
+    page_size = 20
+    max_page_size = 100
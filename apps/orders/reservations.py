@@ -0,0 +1,171 @@
+# apps/orders/reservations.py
+
+"""
+Stock Reservations
+
+Checkout takes stock immediately (see apps/products/stock.py) and records
+a StockReservation per product with an expiry. The ledger tells apart
+units that are sold from units waiting on payment:
+
+- payment deletes the order's holds; cancellation gives the order's
+  stock back and deletes them (restore_order_stock)
+- release_expired_reservations (Celery beat) gives expired holds back to
+  stock in bulk and cancels their still-pending orders, so an abandoned
+  payment never keeps inventory locked for long
+- get_reserved_quantities is a cached per-product read of the units held
+  in unpaid checkouts, served by the orders reserved-stock endpoint rather
+  than the (ETagged) product detail, since holds change without touching
+  the product row
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.products.stock import release_stock
+from .models import Order, OrderItem, StockReservation
+
+RESERVED_CACHE_TIMEOUT = 60
+
+
+def _reserved_cache_key(product_id):
+    return f'orders:reserved:{product_id}'
+
+
+def reservations_changed(product_ids):
+    """Drop cached reserved quantities of `product_ids` once the transaction commits"""
+    keys = [_reserved_cache_key(pk) for pk in set(product_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def reservation_expiry(ttl=None):
+    """When holds created now expire (ttl in seconds, default ORDER_RESERVATION_TTL)"""
+    if ttl is None:
+        ttl = settings.ORDER_RESERVATION_TTL
+    return timezone.now() + timedelta(seconds=ttl)
+
+
+def hold_stock(order, quantities, ttl=None):
+    """
+    Record the stock taken for an unpaid order.
+
+    Args:
+        order: The order the stock was taken for
+        quantities: Dict of product id -> quantity
+        ttl: Seconds until the hold expires (default ORDER_RESERVATION_TTL)
+
+    Returns:
+        list: The created StockReservation rows
+    """
+    expires_at = reservation_expiry(ttl)
+    holds = StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=pk, quantity=quantity, expires_at=expires_at)
+        for pk, quantity in quantities.items()
+    ])
+    reservations_changed(quantities)
+    return holds
+
+
+def extend_holds(order, expires_at):
+    """Keep an order's holds until at least `expires_at`"""
+    return StockReservation.objects.filter(order=order, expires_at__lt=expires_at).update(expires_at=expires_at)
+
+
+def release_holds(order_ids):
+    """
+    Delete the holds of paid or cancelled orders, leaving stock as it is.
+
+    Returns:
+        int: Number of holds deleted
+    """
+    holds = StockReservation.objects.filter(order_id__in=order_ids)
+    product_ids = list(holds.values_list('product_id', flat=True))
+    if not product_ids:
+        return 0
+    deleted, _ = holds.delete()
+    reservations_changed(product_ids)
+    return deleted
+
+
+def restore_order_stock(order_ids):
+    """
+    Give back the stock of cancelled orders (one UPDATE) and drop their holds.
+    
+    Returns:
+        int: Number of products restocked
+    """
+    quantities = dict(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by()
+        .values('product_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    )
+    restocked = release_stock(quantities)
+    release_holds(order_ids)
+    return restocked
+
+
+def get_reserved_quantities(product_ids):
+    """
+    Units of each product held by unexpired reservations.
+
+    Cached per product for RESERVED_CACHE_TIMEOUT seconds; misses are
+    answered with one aggregate query.
+
+    Returns:
+        dict: product id -> reserved quantity
+    """
+    keys = {pk: _reserved_cache_key(pk) for pk in product_ids}
+    cached = cache.get_many(keys.values())
+    reserved = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in keys if pk not in reserved]
+    if missing:
+        totals = dict(
+            StockReservation.objects.filter(product_id__in=missing, expires_at__gt=timezone.now())
+            .values('product_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('product_id', 'total')
+        )
+        fresh = {pk: totals.get(pk, 0) for pk in missing}
+        cache.set_many({keys[pk]: quantity for pk, quantity in fresh.items()}, RESERVED_CACHE_TIMEOUT)
+        reserved.update(fresh)
+
+    return reserved
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Cancel pending orders whose holds expired, giving their stock back.
+
+    Orders locked by a concurrent payment are skipped and picked up by the
+    next run. Holds of orders that are no longer pending are just deleted.
+
+    Args:
+        batch_size (int): Maximum number of orders handled per run
+
+    Returns:
+        int: Number of orders cancelled
+    """
+    order_ids = list(
+        StockReservation.objects.filter(expires_at__lte=timezone.now())
+        .order_by()
+        .values_list('order_id', flat=True)
+        .distinct()[:batch_size]
+    )
+    if not order_ids:
+        return 0
+
+    with transaction.atomic():
+        # Cancelling restores the stock and drops the holds (restore_order_stock)
+        previous, cancelled = Order.bulk_transition(
+            order_ids, 'cancelled', from_statuses=['pending'], skip_locked=True
+        )
+        release_holds(set(previous) - set(cancelled))
+
+    return len(cancelled)
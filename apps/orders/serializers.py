@@ -8,8 +8,15 @@ Serializers for order operations.
 
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Order, OrderItem
+from django.db import transaction
+from django.db.models import Prefetch
+from .models import InvalidTransition, Order, OrderItem
+from .reservations import hold_stock
+from .tasks import record_order_placed, send_order_confirmation_email
 from apps.carts.models import Cart, CartItem
+from apps.carts.store import get_cart_store
+from apps.common.utils import enqueue_on_commit
+from apps.products.stock import StockShortage, reserve_stock
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -33,10 +40,47 @@ class OrderItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class OrderListSerializer(serializers.ModelSerializer):
-    """Serializer for Order list view"""
+class SparseFieldsetMixin:
+    """
+    Serialize only the fields named in ?fields=a,b (plus `id`).
     
-    total_items = serializers.IntegerField(read_only=True)
+    get_columns() lists the model columns the remaining fields read, for
+    use with QuerySet.only().
+    """
+    
+    fields_query_param = 'fields'
+    always_included = ('id',)
+    
+    # Serializer fields whose source isn't a model field of the same name
+    field_columns = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields()
+        if requested:
+            for name in set(self.fields) - requested - set(self.always_included):
+                self.fields.pop(name)
+    
+    def get_requested_fields(self):
+        request = self.context.get('request')
+        if request is None:
+            return None
+        value = request.query_params.get(self.fields_query_param, '')
+        return {name.strip() for name in value.split(',') if name.strip()} or None
+    
+    def get_columns(self):
+        return {
+            self.field_columns.get(name, field.source.split('.')[0])
+            for name, field in self.fields.items()
+        }
+
+
+class OrderListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Serializer for Order list view (reads only the order row)"""
+    
+    field_columns = {'status_display': 'status'}
+    
+    total_items = serializers.IntegerField(source='item_count', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     
     class Meta:
@@ -46,6 +90,7 @@ class OrderListSerializer(serializers.ModelSerializer):
             'status',
             'status_display',
             'total_items',
+            'line_summary',
             'total_amount',
             'created_at',
             'updated_at'
@@ -95,16 +140,23 @@ class CreateOrderSerializer(serializers.Serializer):
         """Validate cart has items and stock availability"""
         user = self.context['request'].user
         
+        # Carts kept outside the database (CART_BACKEND=redis) are written back first
+        get_cart_store().persist(user.pk)
+        
+        # Lines and their products are loaded once and reused by create()
         try:
-            cart = Cart.objects.get(user=user)
+            cart = Cart.objects.prefetch_related(
+                Prefetch('items', queryset=CartItem.objects.select_related('product'))
+            ).get(user=user)
         except Cart.DoesNotExist:
             raise serializers.ValidationError("Cart is empty. Add items before placing order.")
         
-        if not cart.items.exists():
+        cart_items = list(cart.items.all())
+        if not cart_items:
             raise serializers.ValidationError("Cart is empty. Add items before placing order.")
         
         # Validate stock availability for all items
-        for cart_item in cart.items.all():
+        for cart_item in cart_items:
             if not cart_item.is_available:
                 raise serializers.ValidationError({
                     'cart': f"Product '{cart_item.product.name}' is no longer available."
@@ -119,45 +171,78 @@ class CreateOrderSerializer(serializers.Serializer):
         return attrs
     
     def create(self, validated_data):
-        """Create order from cart"""
+        """
+        Create order from cart.
+        
+        Uses the same number of queries for any cart size: one stock
+        UPDATE, one order INSERT, bulk INSERTs of the items and the stock
+        holds, and one DELETE of the cart lines.
+        """
         cart = validated_data.pop('cart')
         user = self.context['request'].user
+        cart_items = list(cart.items.all())
         
-        # Calculate totals
-        subtotal = cart.total_price
-        total_amount = subtotal  # Add shipping/tax later if needed
-        
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            subtotal=subtotal,
-            total_amount=total_amount,
-            shipping_address=validated_data.get('shipping_address', ''),
-            shipping_city=validated_data.get('shipping_city', ''),
-            shipping_country=validated_data.get('shipping_country', ''),
-            shipping_postal_code=validated_data.get('shipping_postal_code', ''),
-            order_notes=validated_data.get('order_notes', '')
-        )
-        
-        # Create order items from cart items
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                product_name=cart_item.product.name,
-                product_sku=cart_item.product.sku,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.unit_price,
-                subtotal=cart_item.subtotal
+        with transaction.atomic():
+            # Stock is taken with conditional UPDATEs, so a concurrent checkout
+            # that got there first makes this fail instead of overselling
+            try:
+                reserve_stock((cart_item.product, cart_item.quantity) for cart_item in cart_items)
+            except StockShortage as exc:
+                raise serializers.ValidationError({
+                    'cart': [
+                        f"Insufficient stock for '{item['name']}'. Only {item['available']} available."
+                        for item in exc.shortages
+                    ]
+                })
+            
+            # Calculate totals (from the prefetched lines)
+            subtotal = cart.total_price
+            total_amount = subtotal  # Add shipping/tax later if needed
+            
+            # Create order
+            order = Order(
+                user=user,
+                subtotal=subtotal,
+                total_amount=total_amount,
+                shipping_address=validated_data.get('shipping_address', ''),
+                shipping_city=validated_data.get('shipping_city', ''),
+                shipping_country=validated_data.get('shipping_country', ''),
+                shipping_postal_code=validated_data.get('shipping_postal_code', ''),
+                order_notes=validated_data.get('order_notes', '')
             )
             
-            # Reduce product stock
-            cart_item.product.stock_quantity -= cart_item.quantity
-            cart_item.product.save()
-        
-        # Clear cart after order is created
-        cart.items.all().delete()
+            # Order items from cart items; bulk_create skips OrderItem.save(),
+            # so the subtotal is filled in here
+            order_items = [
+                OrderItem(
+                    order=order,
+                    product=cart_item.product,
+                    product_name=cart_item.product.name,
+                    product_sku=cart_item.product.sku,
+                    quantity=cart_item.quantity,
+                    unit_price=cart_item.unit_price,
+                    subtotal=cart_item.subtotal
+                )
+                for cart_item in cart_items
+            ]
+            order.summarize_items(order_items)
+            order.save(force_insert=True)
+            OrderItem.objects.bulk_create(order_items)
+            
+            # The stock stays held for this order until it is paid or the hold expires
+            hold_stock(order, {cart_item.product_id: cart_item.quantity for cart_item in cart_items})
+            
+            # Clear cart after order is created
+            CartItem.objects.filter(cart=cart).delete()
+            ordered = {cart_item.product_id: cart_item.quantity for cart_item in cart_items}
+            transaction.on_commit(lambda: get_cart_store().discard(user.pk, ordered))
+            
+            # Everything else happens on Celery once the order is committed
+            enqueue_on_commit(send_order_confirmation_email, str(order.pk))
+            enqueue_on_commit(record_order_placed, str(order.pk))
         
+        # The response renders the items we just created without reading them back
+        order._prefetched_objects_cache = {'items': order_items}
         return order
 
 
@@ -172,23 +257,51 @@ class UpdateOrderStatusSerializer(serializers.ModelSerializer):
         """Validate status transition"""
         instance = self.instance
         
-        # Define valid status transitions
-        valid_transitions = {
-            'pending': ['processing', 'cancelled'],
-            'processing': ['shipped', 'cancelled'],
-            'shipped': ['delivered', 'cancelled'],
-            'delivered': [],  # Final state
-            'cancelled': []   # Final state
-        }
-        
-        if instance and instance.status in ['delivered', 'cancelled']:
+        if instance and not Order.STATUS_TRANSITIONS.get(instance.status):
             raise serializers.ValidationError(
                 f"Cannot change status from '{instance.get_status_display()}'"
             )
         
-        if instance and value not in valid_transitions.get(instance.status, []):
+        if instance and not instance.can_transition_to(value):
             raise serializers.ValidationError(
                 f"Cannot change status from '{instance.get_status_display()}' to '{value}'"
             )
         
-        return value
\ No newline at end of file
+        return value
+    
+    def update(self, instance, validated_data):
+        """Apply the status change as a compare-and-swap"""
+        try:
+            instance.transition_to(validated_data['status'])
+        except InvalidTransition as exc:
+            raise serializers.ValidationError({'status': [str(exc)]})
+        return instance
+
+
+class BulkOrderStatusSerializer(serializers.Serializer):
+    """Serializer for moving many orders to one status (Admin only)"""
+    
+    order_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=1000
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    
+    def validate_order_ids(self, value):
+        """Drop repeated ids, keeping the request order"""
+        return list(dict.fromkeys(value))
+
+
+class ReservedStockQuerySerializer(serializers.Serializer):
+    """Query parameters for the reserved stock lookup"""
+    
+    product = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=100
+    )
+    
+    def validate_product(self, value):
+        """Drop repeated ids, keeping the request order"""
+        return list(dict.fromkeys(value))
@@ -0,0 +1,56 @@
+# apps/orders/stats.py
+
+"""
+Order Counters
+
+Daily order, unit and revenue counters kept in the cache. They are bumped
+by a Celery task after each checkout, so the checkout request never
+waits on them, and read without touching the orders table.
+"""
+
+from decimal import Decimal
+from django.core.cache import cache
+from django.utils import timezone
+
+STATS_TIMEOUT = 90 * 24 * 60 * 60  # 90 days
+
+COUNTERS = ('orders', 'units', 'revenue_cents')
+
+
+def _stats_key(day, counter):
+    return f'orders:stats:{day.isoformat()}:{counter}'
+
+
+def _increment(key, amount):
+    if cache.add(key, amount, timeout=STATS_TIMEOUT):
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, amount, timeout=STATS_TIMEOUT)
+
+
+def record_order(order, units):
+    """Count an order placed on its (local) creation date"""
+    day = timezone.localdate(order.created_at)
+    _increment(_stats_key(day, 'orders'), 1)
+    _increment(_stats_key(day, 'units'), units)
+    _increment(_stats_key(day, 'revenue_cents'), int(order.total_amount * 100))
+
+
+def get_order_stats(day=None):
+    """
+    Orders, units and revenue counted for a day (default today).
+    
+    Returns:
+        dict: orders, units and revenue (Decimal)
+    """
+    day = day or timezone.localdate()
+    values = cache.get_many([_stats_key(day, counter) for counter in COUNTERS])
+    counts = {counter: values.get(_stats_key(day, counter), 0) for counter in COUNTERS}
+    return {
+        'orders': counts['orders'],
+        'units': counts['units'],
+        'revenue': Decimal(counts['revenue_cents']) / 100,
+    }
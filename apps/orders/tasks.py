@@ -0,0 +1,112 @@
+# apps/orders/tasks.py
+
+"""
+Celery Tasks for Orders
+
+Post-checkout work (confirmation email, order counters) queued once the
+order is committed, and background maintenance of stock held by unpaid
+orders.
+"""
+
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Days from order placement to the estimated delivery window
+ESTIMATED_DELIVERY_DAYS = (3, 7)
+
+
+def estimated_delivery(order_date):
+    """Human readable delivery window for an order placed on `order_date`"""
+    earliest, latest = (order_date + timedelta(days=days) for days in ESTIMATED_DELIVERY_DAYS)
+    return f"{earliest:%b %d} - {latest:%b %d, %Y}"
+
+
+@shared_task(bind=True, max_retries=3)
+def send_order_confirmation_email(self, order_id):
+    """
+    Send the order confirmation email.
+    
+    Args:
+        order_id (str): Order's ID
+    
+    Returns:
+        bool: True if email sent successfully
+    """
+    try:
+        from apps.common.utils import send_email
+        from .models import Order
+        
+        order = Order.objects.select_related('user').get(id=order_id)
+        order_date = timezone.localdate(order.created_at)
+        
+        context = {
+            'user_name': order.user.get_full_name(),
+            'order_number': str(order.id),
+            'order_date': f"{order_date:%B %d, %Y}",
+            'total_amount': order.total_amount,
+            'payment_method': 'Card',  # Stripe Checkout only takes cards
+            'estimated_delivery': estimated_delivery(order_date),
+            'site_name': settings.SITE_NAME,
+            'site_url': settings.SITE_URL
+        }
+        
+        send_email(
+            subject=f'Order Confirmation #{str(order.id)[:8]} - {settings.SITE_NAME}',
+            template_name='order_confirmation',
+            context=context,
+            recipient_list=[order.user.email]
+        )
+        
+        logger.info(f"Order confirmation email sent for order {order.id}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Failed to send order confirmation email: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+
+@shared_task
+def record_order_placed(order_id):
+    """
+    Add a placed order to the daily order counters.
+    
+    Args:
+        order_id (str): Order's ID
+    
+    Returns:
+        bool: True if the order was counted
+    """
+    from .models import Order
+    from .stats import record_order
+    
+    order = Order.objects.filter(id=order_id).annotate(units=Sum('items__quantity')).first()
+    if order is None:
+        return False
+    record_order(order, order.units or 0)
+    return True
+
+
+@shared_task
+def release_expired_reservations(batch_size=500):
+    """
+    Give back the stock of unpaid orders whose hold expired, and cancel them.
+    This task should be run periodically (e.g., every minute).
+    
+    Args:
+        batch_size (int): Maximum number of orders handled per run
+    
+    Returns:
+        int: Number of orders cancelled
+    """
+    from .reservations import release_expired_reservations as release
+    
+    cancelled = release(batch_size)
+    if cancelled:
+        logger.info(f"Cancelled {cancelled} orders with expired stock reservations")
+    return cancelled
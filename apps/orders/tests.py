@@ -1,3 +1,670 @@
-from django.test import TestCase
+# apps/orders/tests.py
 
-# Create your tests here.
+"""
+Order Tests
+"""
+
+import threading
+import uuid
+from decimal import Decimal
+from unittest import mock, skipUnless
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.test.client import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from apps.carts.models import Cart, CartItem
+from apps.products.models import Product
+from apps.products.stock import StockShortage, reserve_stock
+from apps.products.testing import create_products
+from .models import InvalidTransition, Order, OrderItem, StockReservation
+from .reservations import get_reserved_quantities, release_holds
+from .serializers import CreateOrderSerializer
+from .stats import get_order_stats
+from .tasks import release_expired_reservations
+
+User = get_user_model()
+
+
+def fill_cart(user, lines):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    for product, quantity in lines:
+        CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+    return cart
+
+
+def stock_of(*products):
+    return [Product.objects.get(pk=product.pk).stock_quantity for product in products]
+
+
+class StockReservationTests(TestCase):
+    """Checkout takes stock with conditional UPDATEs"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_checkout_reserves_stock(self):
+        first, second = create_products(2, stock_quantity=5)
+        fill_cart(self.user, [(first, 2), (second, 5)])
+
+        response = self.client.post(reverse('orders:order-list-create'), {}, format='json', secure=True)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(stock_of(first, second), [3, 0])
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+
+    def test_reserve_stock_is_all_or_nothing(self):
+        first, second, third = create_products(3, stock_quantity=3)
+
+        with self.assertRaises(StockShortage) as raised:
+            reserve_stock([(first, 2), (second, 4), (third, 5)])
+
+        self.assertEqual(
+            [(item['name'], item['requested'], item['available']) for item in raised.exception.shortages],
+            [(second.name, 4, 3), (third.name, 5, 3)]
+        )
+        self.assertEqual(stock_of(first, second, third), [3, 3, 3])
+
+    def test_inactive_products_are_never_reserved(self):
+        product, = create_products(1)
+        Product.objects.filter(pk=product.pk).update(is_active=False)
+
+        with self.assertRaises(StockShortage) as raised:
+            reserve_stock([(product, 1)])
+
+        self.assertEqual(raised.exception.shortages[0]['available'], 0)
+        self.assertEqual(stock_of(product), [10])
+
+    def test_stock_taken_after_validation_fails_cleanly(self):
+        first, second = create_products(2, stock_quantity=4)
+        fill_cart(self.user, [(first, 1), (second, 3)])
+        request = RequestFactory().post('/')
+        request.user = self.user
+        serializer = CreateOrderSerializer(data={}, context={'request': request})
+        self.assertTrue(serializer.is_valid())
+
+        # Another checkout wins the race between validate() and create()
+        Product.objects.filter(pk=second.pk).update(stock_quantity=2)
+
+        with self.assertRaises(serializers.ValidationError) as raised:
+            serializer.save()
+
+        self.assertEqual(
+            raised.exception.detail['cart'],
+            [f"Insufficient stock for '{second.name}'. Only 2 available."]
+        )
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(stock_of(first, second), [4, 2])
+        self.assertEqual(CartItem.objects.filter(cart__user=self.user).count(), 2)
+
+
+class CheckoutQueryCountTests(TestCase):
+    """Placing an order costs the same number of queries for any cart size"""
+
+    def place_order(self, email, line_count):
+        user = User.objects.create_user(email=email, password='pass12345')
+        products = create_products(line_count, prefix=email)
+        fill_cart(user, [(product, 2) for product in products])
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('orders:order-list-create'), {}, format='json', secure=True)
+        self.assertEqual(response.status_code, 201)
+        return response.json()['order'], len(queries)
+
+    def test_query_count_is_independent_of_cart_size(self):
+        _, small = self.place_order('small@example.com', 1)
+        order, large = self.place_order('large@example.com', 25)
+
+        self.assertEqual(small, large)
+        self.assertEqual(order['total_items'], 50)
+        self.assertEqual(len(order['items']), 25)
+
+    def test_order_items_match_cart_lines(self):
+        order, _ = self.place_order('lines@example.com', 3)
+
+        items = OrderItem.objects.filter(order_id=order['id']).order_by('unit_price')
+        self.assertEqual(
+            [(item.quantity, item.unit_price, item.subtotal) for item in items],
+            [(2, Decimal('10.00'), Decimal('20.00')), (2, Decimal('11.00'), Decimal('22.00')), (2, Decimal('12.00'), Decimal('24.00'))]
+        )
+        self.assertEqual(Decimal(order['subtotal']), Decimal('66.00'))
+        self.assertEqual(Product.objects.filter(name__startswith='lines@example.com', stock_quantity=8).count(), 3)
+
+
+class StockReservationLedgerTests(TestCase):
+    """Unpaid orders hold their stock until they expire"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='holder@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.first, self.second = create_products(2, stock_quantity=10)
+
+    def place_order(self, lines):
+        fill_cart(self.user, lines)
+        response = self.client.post(reverse('orders:order-list-create'), {}, format='json', secure=True)
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(pk=response.json()['order']['id'])
+
+    def reserved_stock(self, *products):
+        response = APIClient().get(
+            reverse('orders:reserved-stock'),
+            {'product': [str(product.pk) for product in products]},
+            secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        return [row['reserved_quantity'] for row in response.json()['data']]
+
+    def expire(self, order):
+        StockReservation.objects.filter(order=order).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_checkout_holds_stock(self):
+        order = self.place_order([(self.first, 3), (self.second, 1)])
+
+        holds = {hold.product_id: hold for hold in order.reservations.all()}
+        self.assertEqual({pk: hold.quantity for pk, hold in holds.items()}, {self.first.pk: 3, self.second.pk: 1})
+        self.assertTrue(all(hold.expires_at > timezone.now() for hold in holds.values()))
+
+        self.assertEqual(self.reserved_stock(self.first, self.second), [3, 1])
+        self.assertEqual(stock_of(self.first), [7])
+
+    def test_reserved_stock_follows_payment(self):
+        order = self.place_order([(self.first, 2)])
+        self.assertEqual(self.reserved_stock(self.first), [2])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_holds([order.pk])
+
+        self.assertEqual(self.reserved_stock(self.first), [0])
+        response = self.client.get(reverse('products:product-detail-update-delete', args=[self.first.pk]), secure=True)
+        self.assertNotIn('reserved_quantity', response.json())
+
+    def test_reserved_stock_validates_product_ids(self):
+        url = reverse('orders:reserved-stock')
+
+        self.assertEqual(self.client.get(url, secure=True).status_code, 400)
+        self.assertEqual(self.client.get(url, {'product': 'not-a-uuid'}, secure=True).status_code, 400)
+
+    def test_reserved_quantities_are_cached(self):
+        self.place_order([(self.first, 2)])
+
+        self.assertEqual(get_reserved_quantities([self.first.pk, self.second.pk]), {self.first.pk: 2, self.second.pk: 0})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_reserved_quantities([self.first.pk, self.second.pk]), {self.first.pk: 2, self.second.pk: 0})
+
+    def test_sweeper_releases_expired_holds(self):
+        abandoned = self.place_order([(self.first, 3), (self.second, 2)])
+        paid = self.place_order([(self.first, 1)])
+        fresh = self.place_order([(self.second, 4)])
+        Order.objects.filter(pk=paid.pk).update(status='processing')
+        self.expire(abandoned)
+        self.expire(paid)
+
+        self.assertEqual(release_expired_reservations(), 1)
+
+        self.assertEqual(stock_of(self.first, self.second), [9, 6])
+        self.assertEqual(
+            dict(Order.objects.values_list('pk', 'status')),
+            {abandoned.pk: 'cancelled', paid.pk: 'processing', fresh.pk: 'pending'}
+        )
+        self.assertEqual(list(StockReservation.objects.values_list('order_id', flat=True)), [fresh.pk])
+        self.assertEqual(release_expired_reservations(), 0)
+
+    def test_cancel_releases_holds(self):
+        order = self.place_order([(self.first, 2)])
+
+        response = self.client.patch(reverse('orders:order-cancel', args=[order.pk]), secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(stock_of(self.first), [10])
+
+
+class OrderSummaryTests(TestCase):
+    """Item count and line summary are stored on the order at checkout"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='summary@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_summary_written_at_checkout(self):
+        first, second = create_products(2)
+        fill_cart(self.user, [(first, 2), (second, 3)])
+
+        response = self.client.post(reverse('orders:order-list-create'), {}, format='json', secure=True)
+
+        order = Order.objects.get(pk=response.json()['order']['id'])
+        self.assertEqual(order.item_count, 5)
+        self.assertCountEqual(order.line_summary, [
+            {'product_id': str(first.pk), 'name': first.name, 'quantity': 2},
+            {'product_id': str(second.pk), 'name': second.name, 'quantity': 3},
+        ])
+
+    def test_order_list_does_not_read_items(self):
+        for index in range(3):
+            products = create_products(2, prefix=f'Summary {index}')
+            fill_cart(self.user, [(product, 1) for product in products])
+            self.client.post(reverse('orders:order-list-create'), {}, format='json', secure=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('orders:order-list-create'), secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'orders_orderitem' in query['sql']])
+        orders = response.json()['results']
+        self.assertEqual([order['total_items'] for order in orders], [2, 2, 2])
+        self.assertEqual(len(orders[0]['line_summary']), 2)
+
+
+class OrderHistoryTests(TestCase):
+    """Order history is keyset paginated and reads only the listed columns"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='history@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('orders:order-list-create')
+        now = timezone.now()
+        self.orders = Order.objects.bulk_create([
+            Order(user=self.user, subtotal=index, total_amount=index, item_count=1,
+                  line_summary=[{'name': f'Line {index}', 'quantity': 1}])
+            for index in range(7)
+        ])
+        # bulk_create fills auto_now_add with (nearly) the same instant; spread them out
+        for index, order in enumerate(self.orders):
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=index))
+        other = User.objects.create_user(email='other@example.com', password='pass12345')
+        Order.objects.create(user=other, subtotal=1, total_amount=1)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_walk_the_history_newest_first(self):
+        seen = []
+        data = self.get(self.url, page_size=3)
+        while True:
+            seen.extend(order['id'] for order in data['results'])
+            if not data['pagination']['next']:
+                break
+            data = self.get(data['pagination']['next'])
+
+        self.assertEqual(seen, [str(order.pk) for order in self.orders])
+
+    def test_deep_pages_cost_the_same_queries(self):
+        first_page = self.get(self.url, page_size=2)
+        with CaptureQueriesContext(connection) as first:
+            self.get(self.url, page_size=2)
+        with CaptureQueriesContext(connection) as deep:
+            self.get(first_page['pagination']['next'])
+
+        self.assertEqual(len(first), len(deep))
+
+    def test_sparse_fieldsets(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(self.url, fields='status,total_amount')
+
+        self.assertEqual(set(data['results'][0]), {'id', 'status', 'total_amount'})
+        order_query, = [query['sql'] for query in queries if 'FROM "orders_order"' in query['sql']]
+        self.assertNotIn('line_summary', order_query)
+        self.assertNotIn('shipping_address', order_query)
+
+    def test_list_reads_only_listed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(self.url)
+
+        self.assertEqual(data['results'][0]['line_summary'], [{'name': 'Line 0', 'quantity': 1}])
+        order_query, = [query['sql'] for query in queries if 'FROM "orders_order"' in query['sql']]
+        self.assertNotIn('shipping_address', order_query)
+        self.assertNotIn('order_notes', order_query)
+
+
+class BulkOrderStatusTests(TestCase):
+    """Admins move many orders to a status in one request"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='shopper2@example.com', password='pass12345')
+        admin = User.objects.create_user(email='warehouse@example.com', password='pass12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.url = reverse('orders:order-bulk-status')
+
+    def create_orders(self, *statuses):
+        return [
+            Order.objects.create(user=self.user, subtotal=10, total_amount=10, status=order_status)
+            for order_status in statuses
+        ]
+
+    def patch(self, order_ids, new_status):
+        return self.client.patch(
+            self.url,
+            {'order_ids': [str(order_id) for order_id in order_ids], 'status': new_status},
+            format='json',
+            secure=True
+        )
+
+    def test_per_order_outcomes(self):
+        processing, delivered, other_processing = self.create_orders('processing', 'delivered', 'processing')
+        missing = uuid.uuid4()
+
+        response = self.patch([processing.pk, delivered.pk, missing, other_processing.pk], 'shipped')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['message'], 'Updated 2 of 4 orders to Shipped')
+        self.assertEqual(
+            [(result['id'], result['success'], result['status']) for result in data['data']['results']],
+            [
+                (str(processing.pk), True, 'shipped'),
+                (str(delivered.pk), False, 'delivered'),
+                (str(missing), False, None),
+                (str(other_processing.pk), True, 'shipped'),
+            ]
+        )
+        self.assertEqual(
+            dict(Order.objects.values_list('pk', 'status')),
+            {processing.pk: 'shipped', delivered.pk: 'delivered', other_processing.pk: 'shipped'}
+        )
+
+    def test_query_count_is_independent_of_batch_size(self):
+        counts = []
+        for size in (1, 30):
+            orders = self.create_orders(*['processing'] * size)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.patch([order.pk for order in orders], 'shipped').status_code, 200)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_cancel_restores_stock(self):
+        product, = create_products(1, stock_quantity=10)
+        fill_cart(self.user, [(product, 4)])
+        buyer = APIClient()
+        buyer.force_authenticate(self.user)
+        order_id = buyer.post(reverse('orders:order-list-create'), {}, format='json', secure=True).json()['order']['id']
+        self.assertEqual(stock_of(product), [6])
+
+        self.patch([order_id], 'cancelled')
+
+        self.assertEqual(stock_of(product), [10])
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_requires_admin(self):
+        order, = self.create_orders('processing')
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.patch([order.pk], 'shipped').status_code, 403)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'processing')
+
+
+class OrderStateMachineTests(TestCase):
+    """Status changes are compare-and-swap UPDATEs with their side effects"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='machine@example.com', password='pass12345')
+        self.product, = create_products(1, stock_quantity=10)
+
+    def create_order(self, order_status='pending', quantity=3):
+        order = Order.objects.create(user=self.user, subtotal=10, total_amount=10, status=order_status)
+        OrderItem.objects.create(
+            order=order, product=self.product, product_name=self.product.name,
+            product_sku=self.product.sku, quantity=quantity, unit_price=self.product.price
+        )
+        return order
+
+    def test_transition_is_a_single_update(self):
+        order = self.create_order('processing')
+
+        with CaptureQueriesContext(connection) as queries:
+            order.transition_to('shipped')
+
+        self.assertEqual([query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']], ['UPDATE'])
+        self.assertEqual(order.status, 'shipped')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'shipped')
+
+    def test_disallowed_transition(self):
+        order = self.create_order('delivered')
+
+        with self.assertRaises(InvalidTransition) as raised:
+            order.transition_to('shipped')
+
+        self.assertEqual(str(raised.exception), "Cannot change status from 'Delivered' to 'shipped'")
+
+    def test_stale_instance_loses_the_race(self):
+        order = self.create_order('pending')
+        stale = Order.objects.get(pk=order.pk)
+        order.transition_to('cancelled')
+
+        with self.assertRaises(InvalidTransition) as raised:
+            stale.transition_to('cancelled')
+
+        self.assertEqual(raised.exception.current, 'cancelled')
+        self.assertEqual(stale.status, 'cancelled')
+        self.assertEqual(stock_of(self.product), [13])  # restored once
+
+    def test_stale_instance_retries_when_still_allowed(self):
+        order = self.create_order('pending')
+        Order.objects.filter(pk=order.pk).update(status='processing')
+
+        order.transition_to('cancelled')
+
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'cancelled')
+
+    def test_transition_without_reading(self):
+        order = self.create_order('pending')
+
+        with self.assertNumQueries(3):  # savepoint, UPDATE, release
+            self.assertTrue(Order.transition(order.pk, 'processing', from_statuses=['pending']))
+        self.assertFalse(Order.transition(order.pk, 'processing', from_statuses=['pending']))
+
+    def test_payment_for_cancelled_order_is_not_applied(self):
+        from apps.payments.views import confirm_order_payment
+
+        order = self.create_order('pending')
+        Order.transition(order.pk, 'cancelled')
+
+        with self.assertLogs('apps.payments.views', level='WARNING'):
+            self.assertFalse(confirm_order_payment(order.pk))
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'cancelled')
+
+    def test_admin_cancel_restores_stock(self):
+        order = self.create_order('shipped', quantity=4)
+        admin = User.objects.create_user(email='admin@example.com', password='pass12345', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        url = reverse('orders:order-update-status', args=[order.pk])
+
+        response = client.patch(url, {'status': 'cancelled'}, format='json', secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stock_of(self.product), [14])
+        self.assertEqual(client.patch(url, {'status': 'processing'}, format='json', secure=True).status_code, 400)
+
+
+class OrderCancelTests(TestCase):
+    """Cancelling restores stock in bulk, exactly once"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='canceller@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def place_order(self, lines):
+        fill_cart(self.user, lines)
+        response = self.client.post(reverse('orders:order-list-create'), {}, format='json', secure=True)
+        return response.json()['order']['id']
+
+    def cancel(self, order_id):
+        return self.client.patch(reverse('orders:order-cancel', args=[order_id]), secure=True)
+
+    def test_query_count_is_independent_of_order_size(self):
+        counts = []
+        for line_count in (1, 12):
+            products = create_products(line_count, stock_quantity=5, prefix=f'Cancel {line_count}')
+            order_id = self.place_order([(product, 2) for product in products])
+
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.cancel(order_id).status_code, 200)
+            counts.append(len(queries))
+            self.assertEqual(stock_of(*products), [5] * line_count)
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_cancelling_twice_restores_stock_once(self):
+        product, = create_products(1, stock_quantity=5)
+        order_id = self.place_order([(product, 3)])
+
+        self.assertEqual(self.cancel(order_id).status_code, 200)
+        self.assertEqual(self.cancel(order_id).status_code, 400)
+
+        self.assertEqual(stock_of(product), [5])
+        self.assertEqual(Order.objects.get(pk=order_id).status, 'cancelled')
+
+    def test_cached_product_shows_restored_stock(self):
+        product, = create_products(1, stock_quantity=5)
+        order_id = self.place_order([(product, 3)])
+        url = reverse('products:product-detail-update-delete', args=[product.pk])
+        self.assertEqual(self.client.get(url, secure=True).json()['stock_quantity'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cancel(order_id)
+
+        self.assertEqual(self.client.get(url, secure=True).json()['stock_quantity'], 5)
+
+
+@override_settings(ADMINS=[('Warehouse', 'warehouse@example.com')])
+class PostCheckoutPipelineTests(TestCase):
+    """Side effects of placing an order run on Celery after the commit"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='pipeline@example.com', password='pass12345', first_name='Ada')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def place_order(self):
+        return self.client.post(reverse('orders:order-list-create'), {}, format='json', secure=True)
+
+    def test_nothing_is_sent_before_commit(self):
+        product, = create_products(1)
+        fill_cart(self.user, [(product, 1)])
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertEqual(self.place_order().status_code, 201)
+
+        self.assertTrue(callbacks)
+        self.assertEqual(mail.outbox, [])
+
+    def test_confirmation_email_and_counters(self):
+        first, second = create_products(2)
+        fill_cart(self.user, [(first, 2), (second, 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.place_order()
+        order_id = response.json()['order']['id']
+
+        confirmation, = [message for message in mail.outbox if message.to == [self.user.email]]
+        self.assertIn(order_id[:8], confirmation.subject)
+        self.assertIn(order_id, confirmation.alternatives[0][0])
+        self.assertIn('Ada', confirmation.body)
+        self.assertEqual(get_order_stats(), {'orders': 1, 'units': 3, 'revenue': Decimal('31.00')})
+
+    def test_low_stock_alert(self):
+        plenty, scarce = create_products(2, stock_quantity=20)
+        fill_cart(self.user, [(plenty, 1), (scarce, 15)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place_order()
+
+        alert, = [message for message in mail.outbox if message.to == ['warehouse@example.com']]
+        self.assertIn(f'{scarce.name} ({scarce.sku}): 5 left', alert.body)
+        self.assertNotIn(plenty.name, alert.body)
+
+        # Already below the threshold: later orders don't alert again
+        mail.outbox = []
+        fill_cart(self.user, [(scarce, 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.place_order().status_code, 201)
+        self.assertFalse([message for message in mail.outbox if message.to == ['warehouse@example.com']])
+
+    def test_cached_product_shows_new_stock_without_a_worker(self):
+        product, = create_products(1, stock_quantity=5)
+        url = reverse('products:product-detail-update-delete', args=[product.pk])
+        self.assertEqual(self.client.get(url, secure=True).json()['stock_quantity'], 5)
+        fill_cart(self.user, [(product, 2)])
+
+        # Nothing queued on Celery runs
+        with mock.patch('apps.products.stock.enqueue_on_commit'), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.place_order().status_code, 201)
+
+        self.assertEqual(self.client.get(url, secure=True).json()['stock_quantity'], 3)
+
+    def test_failed_checkout_queues_nothing(self):
+        product, = create_products(1, stock_quantity=1)
+        fill_cart(self.user, [(product, 2)])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(self.place_order().status_code, 400)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(mail.outbox, [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row-level concurrency needs PostgreSQL')
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Concurrent checkouts never sell more than the stock"""
+
+    THREADS = 12
+
+    def place_orders(self, users):
+        barrier = threading.Barrier(len(users))
+        statuses = []
+
+        def checkout(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                statuses.append(client.post(reverse('orders:order-list-create'), {}, format='json', secure=True).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_no_oversell(self):
+        first, second = create_products(2, stock_quantity=5)
+        users = []
+        for index in range(self.THREADS):
+            user = User.objects.create_user(email=f'racer{index}@example.com', password='pass12345')
+            # Opposite line orders for half the buyers to provoke lock-order deadlocks
+            lines = [(first, 1), (second, 1)] if index % 2 else [(second, 1), (first, 1)]
+            fill_cart(user, lines)
+            users.append(user)
+
+        statuses = self.place_orders(users)
+
+        self.assertEqual(statuses.count(201), 5)
+        self.assertEqual(statuses.count(400), self.THREADS - 5)
+        self.assertEqual(stock_of(first, second), [0, 0])
+        self.assertEqual(Order.objects.count(), 5)
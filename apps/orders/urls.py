@@ -9,7 +9,9 @@ from .views import (
     OrderListCreateView,
     OrderDetailView,
     OrderUpdateStatusView,
-    OrderCancelView
+    OrderBulkStatusView,
+    OrderCancelView,
+    ReservedStockView
 )
 
 app_name = 'orders'
@@ -18,6 +20,12 @@ urlpatterns = [
     # Order List & Create
     path('', OrderListCreateView.as_view(), name='order-list-create'),
     
+    # Bulk Order Status Update (Admin)
+    path('bulk-status/', OrderBulkStatusView.as_view(), name='order-bulk-status'),
+    
+    # Stock Held by Unpaid Orders (Public)
+    path('reserved-stock/', ReservedStockView.as_view(), name='reserved-stock'),
+    
     # Order Detail
     path('<uuid:pk>/', OrderDetailView.as_view(), name='order-detail'),
     
@@ -37,7 +45,9 @@ ORDERS ENDPOINTS:
 - GET    /api/v1/orders/                → List user's orders
 - GET    /api/v1/orders/{id}/           → Get order details
 - PATCH  /api/v1/orders/{id}/status/    → Update order status (Admin only)
+- PATCH  /api/v1/orders/bulk-status/    → Update many orders' status (Admin only)
 - PATCH  /api/v1/orders/{id}/cancel/    → Cancel order (User)
+- GET    /api/v1/orders/reserved-stock/?product={id} → Units held by unpaid orders
 
 EXAMPLE REQUESTS:
 
@@ -65,4 +75,11 @@ EXAMPLE REQUESTS:
 
 5. Cancel order (User):
    PATCH /api/v1/orders/{order-id}/cancel/
+
+6. Mark orders as shipped (Admin):
+   PATCH /api/v1/orders/bulk-status/
+   {
+     "order_ids": ["{order-id}", "{order-id}"],
+     "status": "shipped"
+   }
 """
\ No newline at end of file
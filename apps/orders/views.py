@@ -9,18 +9,23 @@ Views for order management.
 """
 
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
 
-from .models import Order
+from .models import InvalidTransition, Order
 from .serializers import (
     OrderListSerializer,
     OrderDetailSerializer,
     CreateOrderSerializer,
-    UpdateOrderStatusSerializer
+    UpdateOrderStatusSerializer,
+    BulkOrderStatusSerializer,
+    ReservedStockQuerySerializer
 )
+from .reservations import get_reserved_quantities
+from .pagination import OrderHistoryPagination
 from .permissions import IsOrderOwner, IsAdminUser
 
 
@@ -30,6 +35,7 @@ class OrderListCreateView(generics.ListCreateAPIView):
     """
     
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderHistoryPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -38,11 +44,30 @@ class OrderListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Return only current user's orders"""
-        return Order.objects.filter(user=self.request.user).prefetch_related('items')
+        return Order.objects.filter(user=self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        # Load only the columns the (possibly sparse) serializer reads, plus
+        # the keyset position
+        serializer = self.get_serializer()
+        columns = serializer.get_columns() | {'id', 'created_at'}
+        queryset = self.get_queryset().only(*columns)
+        
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @extend_schema(
         summary="List user's orders",
-        description="Get list of all orders for the authenticated user, sorted by most recent first.",
+        description="""
+        Get the authenticated user's orders, most recent first.
+        
+        **Pagination:** keyset based. Follow the `next` / `previous` links
+        (?cursor=); ?page_size= up to 100, ?include_count=true adds the total.
+        
+        **Sparse fields:** ?fields=status,total_amount returns only those
+        fields (plus id).
+        """,
         tags=['Orders']
     )
     def get(self, request, *args, **kwargs):
@@ -56,10 +81,13 @@ class OrderListCreateView(generics.ListCreateAPIView):
         **Process:**
         1. Validates cart has items
         2. Checks stock availability
-        3. Creates order with items
-        4. Reduces product stock
+        3. Reserves stock for every item, or fails listing the short items
+        4. Creates order with items
         5. Clears cart
         
+        The confirmation email, low stock alerts, order counters and cache
+        invalidation are queued on Celery once the order is committed.
+        
         **Optional shipping information can be provided.**
         
         Requires authentication.
@@ -143,6 +171,105 @@ class OrderUpdateStatusView(generics.UpdateAPIView):
         })
 
 
+class OrderBulkStatusView(APIView):
+    """
+    Move many orders to one status (Admin only)
+    """
+    
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    @extend_schema(
+        summary="Bulk update order status",
+        description="""
+        Move a list of orders to one status (Admin only), e.g. mark a batch as shipped.
+        
+        Transitions follow the same rules as the single order status update. Orders
+        that can't make the transition (or don't exist) are reported in `results`
+        and left unchanged; the others are updated with a single query.
+        
+        Cancelled orders get their stock back.
+        """,
+        request=BulkOrderStatusSerializer,
+        tags=['Orders']
+    )
+    def patch(self, request):
+        serializer = BulkOrderStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Validation failed',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        order_ids = serializer.validated_data['order_ids']
+        new_status = serializer.validated_data['status']
+        previous, moved = Order.bulk_transition(order_ids, new_status)
+        moved = set(moved)
+        
+        status_labels = dict(Order.STATUS_CHOICES)
+        results = []
+        for order_id in order_ids:
+            result = {'id': str(order_id), 'success': order_id in moved}
+            if order_id not in previous:
+                result.update({'status': None, 'error': 'Order not found.'})
+            elif order_id in moved:
+                result['status'] = new_status
+            else:
+                result.update({
+                    'status': previous[order_id],
+                    'error': f"Cannot change status from '{status_labels[previous[order_id]]}' to '{new_status}'"
+                })
+            results.append(result)
+        
+        return Response({
+            'success': True,
+            'message': f'Updated {len(moved)} of {len(order_ids)} orders to {status_labels[new_status]}',
+            'data': {
+                'status': new_status,
+                'results': results
+            }
+        })
+
+
+class ReservedStockView(APIView):
+    """
+    Units of products held by unpaid checkouts
+    """
+    
+    permission_classes = [AllowAny]
+    
+    @extend_schema(
+        summary="Get reserved stock",
+        description="""
+        Units of each product held by unpaid orders. They return to stock if
+        payment doesn't arrive before the hold expires.
+        
+        Pass up to 100 product ids as repeated `product` query parameters:
+        `?product={id}&product={id}`. Holds change without the product changing,
+        so this is kept out of the (cached, ETagged) product detail.
+        """,
+        tags=['Orders']
+    )
+    def get(self, request):
+        serializer = ReservedStockQuerySerializer(data={'product': request.query_params.getlist('product')})
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Validation failed',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        product_ids = serializer.validated_data['product']
+        reserved = get_reserved_quantities(product_ids)
+        return Response({
+            'success': True,
+            'data': [
+                {'product_id': str(pk), 'reserved_quantity': reserved[pk]}
+                for pk in product_ids
+            ]
+        })
+
+
 class OrderCancelView(generics.UpdateAPIView):
     """
     Cancel order (User can cancel own pending/processing orders)
@@ -152,6 +279,9 @@ class OrderCancelView(generics.UpdateAPIView):
     lookup_field = 'pk'
     http_method_names = ['patch']  # Only allow PATCH, no PUT
     
+    # Statuses users may cancel from
+    cancellable_statuses = ['pending', 'processing']
+    
     def get_queryset(self):
         """Return only current user's orders"""
         return Order.objects.filter(user=self.request.user)
@@ -170,22 +300,17 @@ class OrderCancelView(generics.UpdateAPIView):
     def patch(self, request, *args, **kwargs):
         order = self.get_object()
         
-        # Check if order can be cancelled
-        if order.status not in ['pending', 'processing']:
+        # Compare-and-swap on the status: of concurrent cancellations, payments
+        # and the reservation sweeper only one wins, so stock (restored in the
+        # same transaction, in one UPDATE) comes back exactly once
+        try:
+            order.transition_to('cancelled', from_statuses=self.cancellable_statuses)
+        except InvalidTransition as exc:
             return Response(
-                {'error': f'Cannot cancel order with status: {order.get_status_display()}'},
+                {'error': f'Cannot cancel order with status: {exc.current_display}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Restore stock for all items
-        for item in order.items.all():
-            item.product.stock_quantity += item.quantity
-            item.product.save()
-        
-        # Update order status
-        order.status = 'cancelled'
-        order.save()
-        
         return Response({
             'message': 'Order cancelled successfully',
             'order_id': str(order.id),
@@ -4,7 +4,9 @@
 Payment Views with Stripe Integration
 """
 
+import logging
 import stripe
+from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
 from rest_framework import status, generics
@@ -22,10 +24,38 @@ from .serializers import (
     PaymentDetailSerializer
 )
 from apps.orders.models import Order
+from apps.orders.reservations import extend_holds, release_holds
 
 # Initialize Stripe
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+# Stripe accepts checkout session lifetimes between 30 minutes and 24 hours
+MIN_SESSION_LIFETIME = timedelta(minutes=31)
+MAX_SESSION_LIFETIME = timedelta(hours=23)
+
+# Stock holds outlive the session a little, so a payment completed at the
+# last moment is never for an order the reservation sweeper has cancelled
+HOLD_GRACE_PERIOD = timedelta(minutes=5)
+
+logger = logging.getLogger(__name__)
+
+
+def confirm_order_payment(order_id):
+    """
+    Move a paid order from pending to processing and release its stock holds.
+    
+    The status change is a single compare-and-swap UPDATE, safe against the
+    reservation sweeper and repeated webhook / status check calls.
+    """
+    if Order.transition(order_id, 'processing', from_statuses=['pending']):
+        release_holds([order_id])
+        return True
+    
+    current = Order.objects.filter(id=order_id).values_list('status', flat=True).first()
+    if current == 'cancelled':
+        logger.warning(f"Payment received for cancelled order {order_id}; needs a refund or manual review")
+    return False
+
 
 class CreateCheckoutSessionView(APIView):
     """Create Stripe Checkout Session"""
@@ -66,6 +96,11 @@ class CreateCheckoutSessionView(APIView):
             }
         )
         
+        # The session may only be paid while the order's stock is held
+        lifetime = timedelta(seconds=settings.ORDER_RESERVATION_TTL)
+        session_expires_at = timezone.now() + min(max(lifetime, MIN_SESSION_LIFETIME), MAX_SESSION_LIFETIME)
+        extend_holds(order, session_expires_at + HOLD_GRACE_PERIOD)
+        
         try:
             # Create Stripe Checkout Session
             checkout_session = stripe.checkout.Session.create(
@@ -76,7 +111,7 @@ class CreateCheckoutSessionView(APIView):
                             'currency': 'usd',
                             'product_data': {
                                 'name': f'Order #{str(order.id)[:8]}',
-                                'description': f'{order.total_items} items',
+                                'description': f'{order.item_count} items',
                             },
                             'unit_amount': int(order.total_amount * 100),  # Stripe uses cents
                         },
@@ -84,6 +119,7 @@ class CreateCheckoutSessionView(APIView):
                     }
                 ],
                 mode='payment',
+                expires_at=int(session_expires_at.timestamp()),
                 success_url=request.build_absolute_uri('/') + 'payment-success?session_id={CHECKOUT_SESSION_ID}',
                 cancel_url=request.build_absolute_uri('/') + 'payment-cancel',
                 metadata={
@@ -153,15 +189,14 @@ class CheckSessionStatusView(APIView):
                 payment.save()
                 
                 # Update order status
-                payment.order.status = 'processing'
-                payment.order.save()
+                confirm_order_payment(payment.order_id)
                 
             elif stripe_status == 'unpaid':
                 payment.status = 'pending'
                 payment.save()
             
             return Response({
-                'order_id': str(payment.order.id),
+                'order_id': str(payment.order_id),
                 'status': payment.status,
                 'amount': str(payment.amount),
                 'payment_date': payment.payment_date
@@ -215,8 +250,7 @@ class StripeWebhookView(APIView):
                 payment.save()
                 
                 # Update order status
-                payment.order.status = 'processing'
-                payment.order.save()
+                confirm_order_payment(payment.order_id)
                 
             except Payment.DoesNotExist:
                 pass
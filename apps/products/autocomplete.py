@@ -0,0 +1,113 @@
+# apps/products/autocomplete.py
+
+"""
+Product Autocomplete
+
+Fuzzy name/SKU lookup for search-as-you-type. On PostgreSQL it uses the
+pg_trgm word-similarity operator, served by GIN trigram indexes on
+Product.name and Product.sku, so partial words and typos still match.
+Other databases fall back to icontains.
+
+The hottest prefixes are kept in a small in-process LRU. Entries are keyed
+on the catalog generation (see cache.py), so any product write makes
+them unreachable in every process.
+"""
+
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from .cache import get_generation
+from .models import Product, ProductImage
+
+MIN_TERM_LENGTH = 2
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used mapping"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+prefix_cache = LRUCache(getattr(settings, 'PRODUCT_AUTOCOMPLETE_CACHE_SIZE', 1024))
+
+
+def normalize_term(term):
+    return ' '.join(term.lower().split())
+
+
+def _query_suggestions(term, limit):
+    queryset = Product.objects.filter(is_active=True)
+    if connections[queryset.db].vendor == 'postgresql':
+        # `term <% column` is answered from the gin_trgm_ops indexes
+        queryset = queryset.filter(
+            Q(name__trigram_word_similar=term) | Q(sku__trigram_word_similar=term)
+        ).annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(term, 'name'),
+                TrigramWordSimilarity(term, 'sku')
+            )
+        ).order_by('-similarity', 'name')
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(sku__icontains=term)
+        ).order_by('name')
+
+    storage = ProductImage._meta.get_field('image').storage
+    rows = queryset.values('id', 'name', 'slug', 'primary_image_path')[:limit]
+    return [
+        {
+            'id': str(row['id']),
+            'name': row['name'],
+            'slug': row['slug'],
+            'primary_image': storage.url(row['primary_image_path']) if row['primary_image_path'] else None,
+        }
+        for row in rows
+    ]
+
+
+def get_suggestions(term, limit):
+    """
+    Top `limit` active products whose name or SKU resembles `term`.
+
+    Returns plain dicts (id, name, slug, relative primary_image URL); terms shorter
+    than MIN_TERM_LENGTH return no suggestions.
+    """
+    term = normalize_term(term)
+    if len(term) < MIN_TERM_LENGTH:
+        return []
+
+    key = (get_generation('catalog'), term, limit)
+    suggestions = prefix_cache.get(key)
+    if suggestions is None:
+        suggestions = _query_suggestions(term, limit)
+        prefix_cache.set(key, suggestions)
+    return suggestions
@@ -0,0 +1,138 @@
+# apps/products/cache.py
+
+"""
+Product Response Cache
+
+Versioned (generation based) cache for the public product endpoints.
+
+Cached responses are never deleted. Every cache key embeds a generation
+counter, and product writes bump the counters they affect, so stale keys
+are simply never read again and expire on their own. Invalidation is a
+couple of INCRs regardless of how many pages were cached.
+
+Generations:
+- catalog: bumped on every product write (lists without a category filter)
+- category: bumped when a product enters, leaves or changes in a category
+- product: bumped when the product changes (detail view, by id and slug)
+"""
+
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# Query params that change the product list response
+LIST_CACHE_PARAMS = (
+    'category',
+    'min_price',
+    'max_price',
+    'in_stock',
+    'is_featured',
+    'search',
+    'ordering',
+    'page',
+    'page_size',
+    'cursor',
+    'include_count',
+)
+
+
+# Params that only select a slice of the result set - ignored for counts
+PAGE_ONLY_PARAMS = ('ordering', 'page', 'page_size', 'cursor', 'include_count')
+
+
+def get_cache_timeout():
+    """Lifetime of cached product responses in seconds"""
+    return getattr(settings, 'PRODUCT_CACHE_TIMEOUT', 300)
+
+
+def get_count_cache_timeout():
+    """Lifetime of cached product list counts in seconds"""
+    return getattr(settings, 'PRODUCT_COUNT_CACHE_TIMEOUT', 60)
+
+
+def _generation_key(scope, value=''):
+    return f'products:gen:{scope}:{str(value).strip().lower()}'
+
+
+def _new_generation():
+    # Seed from the clock so an evicted counter never reuses old cache keys
+    return time.time_ns()
+
+
+def get_generation(scope, value=''):
+    """Get the current generation for a scope, creating it if missing"""
+    key = _generation_key(scope, value)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generations(keys):
+    """Increment the given (scope, value) generations"""
+    for scope, value in set(keys):
+        key = _generation_key(scope, value)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Counter was never created or got evicted
+            cache.set(key, _new_generation(), timeout=None)
+
+
+def invalidate_product(product_id, slug='', categories=()):
+    """Invalidate cached responses that may contain the given product"""
+    keys = [('catalog', ''), ('product', product_id)]
+    if slug:
+        keys.append(('product', slug))
+    keys.extend(('category', category) for category in categories if category)
+    bump_generations(keys)
+
+
+def _digest(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def normalize_list_params(query_params, exclude=()):
+    """Normalized, order-independent representation of the list query params"""
+    normalized = []
+    for param in LIST_CACHE_PARAMS:
+        if param not in query_params or param in exclude:
+            continue
+        # Presence matters even when empty: ?cursor= switches to keyset pagination
+        value = query_params.get(param, '').strip()
+        if param == 'category':
+            value = value.lower()  # category filter is case-insensitive
+        normalized.append(f'{param}={value}')
+    return '&'.join(normalized)
+
+
+def _list_generation(request):
+    category = request.query_params.get('category', '').strip()
+    if category:
+        return get_generation('category', category)
+    return get_generation('catalog')
+
+
+def product_list_cache_key(request):
+    """Cache key for a product list request"""
+    generation = _list_generation(request)
+
+    # Host is part of the key because image and pagination links are absolute
+    params = normalize_list_params(request.query_params)
+    return f'products:list:{generation}:{_digest(request.build_absolute_uri("/"), params)}'
+
+
+def product_count_cache_key(request):
+    """Cache key for the result count of a product list filter signature"""
+    generation = _list_generation(request)
+    params = normalize_list_params(request.query_params, exclude=PAGE_ONLY_PARAMS)
+    return f'products:count:{generation}:{_digest(params)}'
+
+
+def product_detail_cache_key(request, lookup_value):
+    """Cache key for a product detail request (by id or slug)"""
+    generation = get_generation('product', lookup_value)
+    return f'products:detail:{generation}:{_digest(request.build_absolute_uri("/"), lookup_value.lower())}'
@@ -0,0 +1,48 @@
+# apps/products/conditional.py
+
+"""
+Conditional GET Helpers
+
+ETag / Last-Modified support for the public product endpoints. Validators
+are derived from Product.updated_at so a repeat fetch is answered with
+304 Not Modified before any serializer runs. Lists only get an ETag, since
+removing a product doesn't make any remaining row newer.
+"""
+
+import hashlib
+from calendar import timegm
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class Validators:
+    """Strong ETag and Last-Modified timestamp for a response"""
+
+    def __init__(self, etag, last_modified=None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @classmethod
+    def build(cls, *parts, last_modified=None):
+        """Build validators from the values that identify a representation"""
+        digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+        return cls(quote_etag(digest), timestamp)
+
+    def not_modified_response(self, request):
+        """Return a 304 response if the client's copy is current, else None"""
+        response = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=self.last_modified
+        )
+        if response is not None:
+            self.apply(response)
+        return response
+
+    def apply(self, response):
+        """Attach the validators to a response"""
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        return response
@@ -7,6 +7,7 @@ Product Filters - Simple category filtering
 """
 
 import django_filters
+from django.db.models.functions import Lower
 from .models import Product
 
 
@@ -14,7 +15,7 @@ class ProductFilter(django_filters.FilterSet):
     """Product filter for category, price range, etc."""
     
     # Filter by category (exact match, case-insensitive)
-    category = django_filters.CharFilter(field_name='category', lookup_expr='iexact')
+    category = django_filters.CharFilter(method='filter_category')
     
     # Price range filters
     min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
@@ -30,6 +31,10 @@ class ProductFilter(django_filters.FilterSet):
         model = Product
         fields = ['category', 'is_featured']
     
+    def filter_category(self, queryset, name, value):
+        """Compare Lower(category) rather than iexact so the functional index is used"""
+        return queryset.alias(category_lower=Lower('category')).filter(category_lower=value.lower())
+    
     def filter_in_stock(self, queryset, name, value):
         """Filter products that are in stock"""
         if value:
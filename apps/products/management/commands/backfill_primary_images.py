@@ -0,0 +1,42 @@
+# apps/products/management/commands/backfill_primary_images.py
+
+"""
+Backfill Product.primary_image_path
+
+Recomputes the denormalized primary image path of every product from
+ProductImage in a single UPDATE. Run after bulk imports or raw SQL edits
+that bypass ProductImage.save/delete.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.products.models import Product, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Recompute Product.primary_image_path from the primary ProductImage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only update products that have no cached primary image path',
+        )
+
+    def handle(self, *args, **options):
+        primary_image = ProductImage.objects.filter(
+            product=OuterRef('pk'),
+            is_primary=True
+        ).values('image')[:1]
+
+        products = Product.objects.all()
+        if options['only_missing']:
+            products = products.filter(primary_image_path='')
+
+        updated = products.update(
+            primary_image_path=Coalesce(Subquery(primary_image), Value(''))
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled primary image path for {updated} products'))
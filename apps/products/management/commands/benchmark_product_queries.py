@@ -0,0 +1,132 @@
+# apps/products/management/commands/benchmark_product_queries.py
+
+"""
+Benchmark product list queries
+
+Runs EXPLAIN and times the queries behind the public product list
+(default, category, price range, featured) built through ProductFilter,
+and reports whether each plan falls back to a sequential scan of the
+products table. Use --seed to insert synthetic products first; they are
+rolled back when the command finishes.
+"""
+
+import re
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.products.filters import ProductFilter
+from apps.products.models import Product
+
+# (label, filter params, ordering) mirroring common /products/ requests
+BENCHMARK_QUERIES = (
+    ('default list', {}, '-created_at'),
+    ('category', {'category': 'electronics'}, '-created_at'),
+    ('price range', {'min_price': '100', 'max_price': '200'}, 'price'),
+    ('featured', {'is_featured': 'true'}, '-created_at'),
+)
+
+SEED_CATEGORIES = ('Electronics', 'Books', 'Home', 'Toys', 'Garden', 'Sports', 'Beauty', 'Music')
+
+
+class Rollback(Exception):
+    pass
+
+
+def is_sequential_scan(plan, table):
+    """Whether an EXPLAIN plan reads `table` without an index"""
+    table = re.escape(table)
+    patterns = (
+        rf'\bSeq Scan on {table}\b',  # PostgreSQL (also "Parallel Seq Scan")
+        rf'\bSCAN (?:TABLE )?{table}\b(?! USING)',  # SQLite; rows start with id columns
+    )
+    return any(re.search(pattern, plan) for pattern in patterns)
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN and time the product list queries, flagging sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Insert this many synthetic products before measuring (rolled back afterwards)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Executions per query for the timing (best run is reported)',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Exit with an error if any query plan uses a sequential scan',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                sequential = self.run_benchmarks(options)
+                # Never keep the synthetic rows
+                raise Rollback
+        except Rollback:
+            pass
+
+        if sequential and options['check']:
+            raise CommandError(f"Sequential scans in: {', '.join(sequential)}")
+
+    def seed(self, count):
+        batch = [
+            Product(
+                name=f'Benchmark Product {index}',
+                slug=f'benchmark-product-{index}',
+                sku=f'BENCH-{index}',
+                description='Synthetic product for query benchmarks',
+                category=SEED_CATEGORIES[index % len(SEED_CATEGORIES)],
+                price=Decimal(index % 1000) + Decimal('0.99'),
+                stock_quantity=index % 50,
+                is_active=index % 10 != 0,
+                is_featured=index % 25 == 0,
+            )
+            for index in range(count)
+        ]
+        Product.objects.bulk_create(batch, batch_size=1000)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Product._meta.db_table}')
+        self.stdout.write(f'Seeded {count} products')
+
+    def run_benchmarks(self, options):
+        table = Product._meta.db_table
+        sequential = []
+        for label, params, ordering in BENCHMARK_QUERIES:
+            base = Product.objects.filter(is_active=True)
+            queryset = ProductFilter(params, queryset=base).qs.order_by(ordering)[:options['page_size']]
+
+            plan = queryset.explain()
+            best = None
+            for _ in range(max(options['repeat'], 1)):
+                started = time.perf_counter()
+                list(queryset.values_list('pk', flat=True))
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            uses_seq_scan = is_sequential_scan(plan, table)
+            if uses_seq_scan:
+                sequential.append(label)
+            status = self.style.ERROR('SEQ SCAN') if uses_seq_scan else self.style.SUCCESS('index')
+            self.stdout.write(f'{label}: {status} ({best * 1000:.2f} ms)')
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        return sequential
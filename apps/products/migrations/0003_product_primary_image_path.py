@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:49
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_primary_image_path(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+    primary_image = ProductImage.objects.filter(
+        product=OuterRef('pk'), is_primary=True
+    ).values('image')[:1]
+    Product.objects.update(primary_image_path=Coalesce(Subquery(primary_image), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_product_category_alter_product_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_path',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_primary_image_path, migrations.RunPython.noop),
+    ]
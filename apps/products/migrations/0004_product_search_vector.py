@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:05
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from apps.products.search import build_search_vector
+
+# GIN indexes and tsvector only exist on PostgreSQL; other databases fall back to icontains search
+SEARCH_INDEX_NAME = 'products_product_search_gin'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('products', 'Product')
+    Product.objects.update(search_vector=build_search_vector())
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} '
+        f'ON {Product._meta.db_table} USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_primary_image_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:40
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# (index name, column) - GIN trigram indexes for the autocomplete endpoint
+TRIGRAM_INDEXES = (
+    ('products_product_name_trgm', 'name'),
+    ('products_product_sku_trgm', 'sku'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('products', 'Product')._meta.db_table
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_vector'),
+    ]
+
+    operations = [
+        # No-op on databases other than PostgreSQL
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
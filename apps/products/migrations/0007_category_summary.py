@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:59
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import Lower
+
+
+def build_category_summaries(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    CategorySummary = apps.get_model('products', 'CategorySummary')
+    rows = Product.objects.filter(is_active=True).annotate(key=Lower('category')).order_by().values('key').annotate(
+        display_name=Min('category'),
+        product_count=Count('id'),
+        in_stock_count=Count('id', filter=Q(stock_quantity__gt=0)),
+        min_price=Min('price'),
+        max_price=Max('price'),
+    )
+    CategorySummary.objects.bulk_create(
+        CategorySummary(name=row.pop('display_name'), **row) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySummary',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('in_stock_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'category summaries',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(build_category_summaries, migrations.RunPython.noop),
+    ]
@@ -7,10 +7,19 @@ Simple Product Model - Category as text field (no separate table)
 """
 
 import uuid
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Value, When
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.text import slugify
 from decimal import Decimal
 
+from apps.common.utils import enqueue_on_commit
+from .cache import invalidate_product
+from .search import SEARCH_FIELD_NAMES, update_search_vector
+from .tasks import refresh_category_summaries
+
 
 class Product(models.Model):
     """Product Model - Simplified with category as text field"""
@@ -37,6 +46,12 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     
+    # Primary image path - denormalized from ProductImage so read paths skip the images table
+    primary_image_path = models.CharField(max_length=255, blank=True, editable=False)
+    
+    # Full-text search document (PostgreSQL, GIN indexed) - maintained in save()
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # SEO
     meta_title = models.CharField(max_length=60, blank=True)
     meta_description = models.CharField(max_length=160, blank=True)
@@ -51,11 +66,36 @@ class Product(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
             models.Index(fields=['-created_at']),
+            # Case-insensitive category lookups (ProductFilter compares Lower(category))
+            models.Index(Lower('category'), name='product_category_lower_idx'),
+            # Partial indexes for the public list, which always filters is_active
+            models.Index(
+                Lower('category'), F('created_at').desc(),
+                name='product_active_cat_created_idx',
+                condition=Q(is_active=True)
+            ),
+            models.Index(
+                fields=['price'],
+                name='product_active_price_idx',
+                condition=Q(is_active=True)
+            ),
+            models.Index(
+                fields=['is_featured', '-created_at'],
+                name='product_active_featured_idx',
+                condition=Q(is_active=True)
+            ),
         ]
     
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored category so moving a product invalidates both categories
+        instance._loaded_category = instance.__dict__.get('category')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -65,6 +105,27 @@ class Product(models.Model):
             self.sku = f"PRD-{str(self.id)[:8].upper()}"
         
         super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or SEARCH_FIELD_NAMES.intersection(update_fields):
+            update_search_vector(Product.objects.filter(pk=self.pk))
+        
+        self.invalidate_cache()
+    
+    def delete(self, *args, **kwargs):
+        # Capture the key before delete() clears the primary key
+        self.invalidate_cache()
+        return super().delete(*args, **kwargs)
+    
+    def invalidate_cache(self):
+        """Invalidate cached API responses for this product once the transaction commits"""
+        product_id, slug = self.pk, self.slug
+        categories = {self.category, getattr(self, '_loaded_category', None)}
+        transaction.on_commit(lambda: invalidate_product(product_id, slug, categories))
+        
+        # Category facet counts are recomputed for the affected categories only
+        enqueue_on_commit(refresh_category_summaries, sorted(category for category in categories if category))
+        self._loaded_category = self.category
     
     @property
     def stock_status(self):
@@ -87,6 +148,13 @@ class Product(models.Model):
     def is_on_sale(self):
         """Check if product is on sale"""
         return bool(self.compare_price and self.compare_price > self.price)
+    
+    @property
+    def primary_image_url(self):
+        """Get primary image URL from the cached path (no query)"""
+        if not self.primary_image_path:
+            return None
+        return ProductImage._meta.get_field('image').storage.url(self.primary_image_path)
 
 
 class ProductImage(models.Model):
@@ -107,11 +175,122 @@ class ProductImage(models.Model):
         return f"{self.product.name} - Image {self.order}"
     
     def save(self, *args, **kwargs):
-        # Ensure only one primary image per product
-        if self.is_primary:
-            ProductImage.objects.filter(
-                product=self.product, 
-                is_primary=True
-            ).exclude(id=self.id).update(is_primary=False)
+        with transaction.atomic():
+            # Ensure only one primary image per product
+            if self.is_primary:
+                ProductImage.objects.filter(
+                    product=self.product, 
+                    is_primary=True
+                ).exclude(id=self.id).update(is_primary=False)
+            
+            super().save(*args, **kwargs)
+            
+            # Keep the product's cached primary image path in sync
+            if self.is_primary:
+                self._touch_product(primary_image_path=self.image.name)
+            else:
+                self._touch_product(clear_primary_image_path=True)
+            
+            self.product.invalidate_cache()
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._touch_product(clear_primary_image_path=self.is_primary)
+            result = super().delete(*args, **kwargs)
+            self.product.invalidate_cache()
+            return result
+    
+    def _touch_product(self, primary_image_path=None, clear_primary_image_path=False):
+        """
+        Bump the product's updated_at, which its ETag and Last-Modified are
+        built from, so any change to its images changes its validators.
+        
+        Args:
+            primary_image_path: Point the cached primary image path here
+            clear_primary_image_path: Clear the cached path if it still
+                points at this image
+        """
+        fields = {'updated_at': timezone.now()}
+        if primary_image_path is not None:
+            fields['primary_image_path'] = primary_image_path
+        elif clear_primary_image_path:
+            fields['primary_image_path'] = Case(
+                When(primary_image_path=self.image.name, then=Value('')),
+                default=F('primary_image_path')
+            )
+        Product.objects.filter(pk=self.product_id).update(**fields)
+        
+        if self._meta.get_field('product').is_cached(self):
+            product = self.product
+            product.updated_at = fields['updated_at']
+            if primary_image_path is not None:
+                product.primary_image_path = primary_image_path
+            elif clear_primary_image_path and product.primary_image_path == self.image.name:
+                product.primary_image_path = ''
+
+
+class CategorySummary(models.Model):
+    """
+    Facet counts for one category over active products.
+    
+    Categories are free text on Product, so this table is the category
+    menu: one row per case-insensitive category, refreshed per category
+    after product writes (see tasks.refresh_category_summaries).
+    """
+    
+    key = models.CharField(max_length=100, primary_key=True)  # Lower(category)
+    name = models.CharField(max_length=100)
+    product_count = models.PositiveIntegerField(default=0)
+    in_stock_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'category summaries'
+    
+    def __str__(self):
+        return f"{self.name} ({self.product_count})"
+    
+    @classmethod
+    def refresh(cls, categories=None):
+        """
+        Recompute summaries for the given category names, or for all
+        categories when None. Returns the number of summaries written.
+        """
+        products = Product.objects.filter(is_active=True).annotate(key=Lower('category'))
+        keys = None
+        if categories is not None:
+            keys = {category.strip().lower() for category in categories if category and category.strip()}
+            if not keys:
+                return 0
+            products = products.filter(key__in=keys)
+        
+        rows = products.order_by().values('key').annotate(
+            display_name=Min('category'),
+            product_count=Count('id'),
+            in_stock_count=Count('id', filter=Q(stock_quantity__gt=0)),
+            min_price=Min('price'),
+            max_price=Max('price'),
+        )
+        now = timezone.now()
+        summaries = [
+            cls(name=row.pop('display_name'), updated_at=now, **row)
+            for row in rows
+        ]
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        with transaction.atomic():
+            # Categories with no active products left disappear from the menu
+            stale = cls.objects.exclude(key__in=[summary.key for summary in summaries])
+            if keys is not None:
+                stale = stale.filter(key__in=keys)
+            stale.delete()
+            
+            cls.objects.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=['key'],
+                update_fields=['name', 'product_count', 'in_stock_count', 'min_price', 'max_price', 'updated_at']
+            )
+        return len(summaries)
@@ -6,30 +6,370 @@ Pagination Configuration
 Custom pagination classes for product APIs.
 """
 
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import cached_property
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from .cache import get_count_cache_timeout, product_count_cache_key
 
-class ProductPagination(PageNumberPagination):
+
+def estimate_count(queryset):
+    """
+    Planner row estimate for a queryset on PostgreSQL, or None elsewhere.
+
+    Unfiltered querysets read pg_class.reltuples; filtered ones use the
+    row estimate of EXPLAIN. Neither touches the table rows.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else None
+        else:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+
+    # reltuples is -1 for tables that were never vacuumed/analyzed
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+class CachedCountMixin:
+    """
+    Product list counts cached per filter signature and, for very large
+    result sets on PostgreSQL, replaced by a planner estimate.
+
+    Cached counts are keyed on the catalog/category generation, so product
+    writes invalidate them. Estimated counts are flagged with count_is_estimate.
+    """
+    count_is_estimate = False
+
+    def get_count(self, queryset):
+        cache_key = product_count_cache_key(self.request)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            count, self.count_is_estimate = cached
+            return count
+
+        count, self.count_is_estimate = None, False
+        threshold = getattr(settings, 'PRODUCT_COUNT_ESTIMATE_THRESHOLD', 0)
+        if threshold:
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate >= threshold:
+                count, self.count_is_estimate = estimate, True
+        if count is None:
+            count = queryset.count()
+
+        cache.set(cache_key, (count, self.count_is_estimate), get_count_cache_timeout())
+        return count
+
+
+class EstimatedCountPage(Page):
+    """Page whose has_next comes from fetching one row past it"""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CountingPaginator(Paginator):
+    """
+    Django paginator that delegates the count to a callback.
+
+    The callback returns (count, is_estimate). An estimated count is only
+    reported: page numbers aren't checked against it, and whether another
+    page exists is learned by fetching one row more than the page holds.
+    """
+
+    def __init__(self, object_list, per_page, count_function=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_function = count_function
+
+    @cached_property
+    def _count(self):
+        if self.count_function is None:
+            return super().count, False
+        return self.count_function(self.object_list)
+
+    @property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._count[1]
+
+    def validate_number(self, number):
+        if not self.count_is_estimate:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_estimate:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return EstimatedCountPage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over an ordering field plus `id` as tie-breaker.
+
+    Pages are located with WHERE (field, id) beyond the last row seen instead
+    of OFFSET, so deep pages cost the same as the first one and rows inserted
+    concurrently never shift or duplicate results. No COUNT(*) is run unless
+    the client asks for it with ?include_count=true.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    include_count_query_param = 'include_count'
+    ordering_query_param = 'ordering'
+
+    # Default ordering and the orderings clients may select with ?ordering=
+    ordering = '-created_at'
+    allowed_orderings = ('-created_at', 'created_at')
+    tiebreaker = 'id'
+
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering_field = self.get_ordering(request)
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['reverse'])
+
+        self.count = None
+        if self.include_count(request):
+            self.count = self.get_count(queryset)
+
+        # Walking backwards flips every direction; the page is re-reversed below
+        field = self.ordering_field.lstrip('-')
+        descending = self.ordering_field.startswith('-') != reverse
+        tiebreaker_descending = reverse
+
+        queryset = queryset.order_by(
+            f"{'-' if descending else ''}{field}",
+            f"{'-' if tiebreaker_descending else ''}{self.tiebreaker}"
+        )
+        if cursor:
+            queryset = queryset.filter(
+                self.get_seek_filter(field, descending, tiebreaker_descending, cursor)
+            )
+
+        # Fetch one extra row to learn whether another page exists
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request):
+        """Requested ordering if it is keyset-capable, else the default"""
+        ordering = request.query_params.get(self.ordering_query_param, '').strip()
+        return ordering if ordering in self.allowed_orderings else self.ordering
+
+    def include_count(self, request):
+        value = request.query_params.get(self.include_count_query_param, '')
+        return value.lower() in ('1', 'true', 'yes')
+
+    def get_count(self, queryset):
+        return queryset.count()
+
+    def get_seek_filter(self, field, descending, tiebreaker_descending, cursor):
+        """Rows strictly after the cursor position in the current ordering"""
+        field_lookup = 'lt' if descending else 'gt'
+        tiebreaker_lookup = 'lt' if tiebreaker_descending else 'gt'
+        return (
+            Q(**{f'{field}__{field_lookup}': cursor['value']}) |
+            Q(**{field: cursor['value'], f'{self.tiebreaker}__{tiebreaker_lookup}': cursor['id']})
+        )
+
+    def encode_cursor(self, obj, reverse=False):
+        field = self.ordering_field.lstrip('-')
+        value = getattr(obj, field)
+        payload = {
+            'o': self.ordering_field,
+            'v': value.isoformat() if hasattr(value, 'isoformat') else str(value),
+            'i': str(getattr(obj, self.tiebreaker)),
+            'r': reverse,
+        }
+        encoded = urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        """Decode ?cursor= into field/id values; an empty cursor means the first page"""
+        encoded = request.query_params.get(self.cursor_query_param, '').strip()
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            if payload['o'] != self.ordering_field:
+                raise ValueError('Cursor belongs to a different ordering')
+            field = model._meta.get_field(self.ordering_field.lstrip('-'))
+            tiebreaker = model._meta.get_field(self.tiebreaker)
+            return {
+                'value': field.to_python(payload['v']),
+                'id': tiebreaker.to_python(payload['i']),
+                'reverse': bool(payload.get('r')),
+            }
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_pagination_data(self):
+        data = {
+            'page_size': self.page_size,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'has_next': self.has_next,
+            'has_previous': self.has_previous,
+        }
+        if self.count is not None:
+            data['count'] = self.count
+        return data
+
+    def get_paginated_response(self, data):
+        return Response({
+            'success': True,
+            'pagination': self.get_pagination_data(),
+            'results': data
+        })
+
+
+class ProductCursorPagination(CachedCountMixin, KeysetPagination):
+    """
+    Keyset pagination for the product catalog over (-created_at, id) or price
+    """
+    allowed_orderings = ('-created_at', 'created_at', 'price', '-price')
+
+    def get_pagination_data(self):
+        data = super().get_pagination_data()
+        if self.count is not None:
+            data['count_is_estimate'] = self.count_is_estimate
+        return data
+
+
+class ProductPagination(CachedCountMixin, PageNumberPagination):
     """
     Custom pagination for product listings
+
+    Page-number based by default. Passing ?cursor= (empty for the first page)
+    switches to keyset pagination, which skips COUNT(*) and OFFSET scans.
+    Page-number counts are cached and may be planner estimates (count_is_estimate);
+    an estimate is only reported, never used to validate pages or find the last one.
     """
     page_size = 20  # Default number of products per page
     page_size_query_param = 'page_size'
     max_page_size = 100  # Maximum products per page
     page_query_param = 'page'
+    cursor_pagination_class = ProductCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.request = request
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_result_count(self):
+        """Count reported for the current page (None when cursor mode omits it)"""
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.count
+        return self.page.paginator.count
+
+    def get_count_and_estimate(self, queryset):
+        count = self.get_count(queryset)
+        return count, self.count_is_estimate
+
+    def django_paginator_class(self, object_list, per_page, **kwargs):
+        return CountingPaginator(object_list, per_page, count_function=self.get_count_and_estimate, **kwargs)
 
     def get_paginated_response(self, data):
         """
         Return paginated response with additional metadata
         """
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+
         return Response({
             'success': True,
             'pagination': {
                 'count': self.page.paginator.count,
+                'count_is_estimate': self.count_is_estimate,
                 'page_size': self.page_size,
                 'current_page': self.page.number,
-                'total_pages': self.page.paginator.num_pages,
+                # Unknown when the count is only an estimate
+                'total_pages': None if self.count_is_estimate else self.page.paginator.num_pages,
                 'next': self.get_next_link(),
                 'previous': self.get_previous_link(),
                 'has_next': self.page.has_next(),
@@ -46,4 +386,4 @@ class LargeProductPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 200
-    page_query_param = 'page'
\ No newline at end of file
+    page_query_param = 'page'
@@ -0,0 +1,99 @@
+# apps/products/search.py
+
+"""
+Product Search
+
+Full-text search over a stored tsvector column (Product.search_vector)
+with a GIN index on PostgreSQL. Matches are ranked with ts_rank and every
+search term is prefix-matched, so partial words work for type-ahead.
+
+Other databases (SQLite in local development and tests) fall back to
+DRF's SearchFilter, i.e. icontains over the view's search_fields.
+"""
+
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F
+from rest_framework import filters
+
+SEARCH_CONFIG = 'english'
+
+# Fields feeding the search vector and their ts_rank weights
+SEARCH_WEIGHTS = (
+    ('name', 'A'),
+    ('sku', 'A'),
+    ('category', 'B'),
+    ('short_description', 'C'),
+    ('description', 'D'),
+)
+SEARCH_FIELD_NAMES = frozenset(field for field, _ in SEARCH_WEIGHTS)
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def supports_full_text_search(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def build_search_vector():
+    """Weighted tsvector expression over the searchable product fields"""
+    vector = None
+    for field, weight in SEARCH_WEIGHTS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vector(queryset):
+    """Recompute the stored search vector for the given products (PostgreSQL only)"""
+    if not supports_full_text_search(queryset.db):
+        return 0
+    return queryset.update(search_vector=build_search_vector())
+
+
+def build_search_query(terms):
+    """
+    Prefix tsquery matching every term (`lapt gam` -> `lapt:* & gam:*`),
+    or None if the terms contain no searchable words.
+    """
+    tokens = [token for term in terms for token in _TOKEN_RE.findall(term)]
+    if not tokens:
+        return None
+    # Tokens are plain word characters, so the raw query can't be malformed
+    raw = ' & '.join(f'{token}:*' for token in tokens)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the GIN-indexed search vector on PostgreSQL.
+
+    Results are annotated with search_rank; ProductOrderingFilter orders
+    by it when the client doesn't pick an ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not supports_full_text_search(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        query = build_search_query(terms)
+        if query is None:
+            return queryset.none()
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that defaults to relevance for full-text searches"""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if 'search_rank' in queryset.query.annotations and ordering == self.get_default_ordering(view):
+            return ['-search_rank', *(ordering or ())]
+        return ordering
@@ -10,7 +10,7 @@ No category table, no category APIs needed!
 
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Product, ProductImage
+from .models import Product, ProductImage, CategorySummary
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
@@ -63,12 +63,12 @@ class ProductListSerializer(serializers.ModelSerializer):
     
     def get_primary_image(self, obj):
         """Get primary image URL"""
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
+        primary_image_url = obj.primary_image_url
+        if primary_image_url:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(primary_image.image.url)
-            return primary_image.image.url
+                return request.build_absolute_uri(primary_image_url)
+            return primary_image_url
         return None
 
 
@@ -334,4 +334,12 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
                     order=max_order + index
                 )
         
-        return instance
\ No newline at end of file
+        return instance
+
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    """Serializer for category facet counts"""
+    
+    class Meta:
+        model = CategorySummary
+        fields = ['name', 'key', 'product_count', 'in_stock_count', 'min_price', 'max_price']
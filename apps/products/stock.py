@@ -0,0 +1,167 @@
+# apps/products/stock.py
+
+"""
+Product Stock
+
+Stock is changed with conditional UPDATEs rather than read-modify-save,
+so concurrent checkouts can't oversell and nothing is read and locked
+up front with SELECT ... FOR UPDATE:
+
+    UPDATE products_product
+       SET stock_quantity = stock_quantity - CASE id WHEN ? THEN q1 ... END
+     WHERE id IN (...) AND stock_quantity >= CASE id WHEN ? THEN q1 ... END
+
+The statements don't go through Product.save(), so the cached API
+responses are invalidated here once the transaction commits (a few cache
+INCRs, inline like Product.save(), so stale stock is never served), while
+the category summary refresh and low stock alerts are queued on Celery.
+"""
+
+from django.db import OperationalError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.common.utils import enqueue_on_commit
+from .cache import invalidate_product
+from .models import Product
+from .tasks import check_low_stock, refresh_category_summaries
+
+RESERVE_ATTEMPTS = 3
+DEADLOCK_DETECTED = '40P01'  # PostgreSQL SQLSTATE
+
+
+class StockShortage(Exception):
+    """One or more products don't have enough stock for a reservation"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(', '.join(f"{item['name']} ({item['available']} available)" for item in shortages))
+
+
+def stock_changed(products):
+    """Invalidate cached data derived from the stock of `products` on commit"""
+    products = list(products)
+    if not products:
+        return
+
+    changed = [(product.pk, product.slug, product.category) for product in products]
+
+    def invalidate():
+        for product_id, slug, category in changed:
+            invalidate_product(product_id, slug, [category])
+
+    transaction.on_commit(invalidate)
+    enqueue_on_commit(refresh_category_summaries, sorted({category for _, _, category in changed}))
+
+
+def _by_product(lines):
+    """Merge (product, quantity) lines into {pk: [product, total quantity]}"""
+    merged = {}
+    for product, quantity in lines:
+        if product.pk in merged:
+            merged[product.pk][1] += quantity
+        else:
+            merged[product.pk] = [product, quantity]
+    return merged
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _quantity_case(quantities):
+    """CASE expression mapping product ids to their quantity"""
+    return Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        output_field=IntegerField()
+    )
+
+
+def reserve_stock(lines):
+    """
+    Take stock for every (product, quantity) line, or for none of them.
+
+    All lines are reserved by one UPDATE whose per-row quantity is a CASE
+    on the product id, so the cost doesn't grow with the number of lines.
+
+    Args:
+        lines: Iterable of (Product, quantity) pairs
+
+    Raises:
+        StockShortage: Listing every line that is short; nothing is reserved
+    """
+    lines = _by_product(lines)
+    if not lines:
+        return
+
+    quantities = _quantity_case({pk: quantity for pk, (_, quantity) in lines.items()})
+    now = timezone.now()
+
+    for attempt in range(1, RESERVE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                reserved = Product.objects.filter(
+                    pk__in=lines,
+                    is_active=True,
+                    stock_quantity__gte=quantities
+                ).update(stock_quantity=F('stock_quantity') - quantities, updated_at=now)
+                if reserved != len(lines):
+                    # Undo the rows that did have enough stock
+                    raise _Rollback
+            break
+        except _Rollback:
+            available = dict(
+                Product.objects.filter(pk__in=lines, is_active=True).values_list('pk', 'stock_quantity')
+            )
+            shortages = [
+                {
+                    'product_id': str(pk),
+                    'name': product.name,
+                    'requested': quantity,
+                    'available': available.get(pk, 0),
+                }
+                for pk, (product, quantity) in lines.items()
+                if available.get(pk, 0) < quantity
+            ]
+            # Empty only if stock was added back in the meantime; try again
+            if shortages or attempt == RESERVE_ATTEMPTS:
+                raise StockShortage(shortages) from None
+        except OperationalError as exc:
+            # Rows are locked in scan order, which concurrent multi-line
+            # reservations may not share; the savepoint makes a retry safe
+            if attempt == RESERVE_ATTEMPTS or getattr(exc.__cause__, 'pgcode', None) != DEADLOCK_DETECTED:
+                raise
+
+    # Rows we just updated are locked until commit, so this is the stock
+    # right after the reservation
+    stock = dict(Product.objects.filter(pk__in=lines).values_list('pk', 'stock_quantity'))
+    for pk, (product, quantity) in lines.items():
+        product.stock_quantity = stock[pk]
+        product.updated_at = now
+    stock_changed(product for product, _ in lines.values())
+    enqueue_on_commit(
+        check_low_stock,
+        [[str(pk), stock[pk] + quantity, stock[pk]] for pk, (_, quantity) in lines.items()]
+    )
+
+
+def release_stock(quantities):
+    """
+    Give stock back with one UPDATE.
+
+    Args:
+        quantities: Dict of product id -> quantity to add back
+
+    Returns:
+        int: Number of products updated
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity}
+    if not quantities:
+        return 0
+
+    released = Product.objects.filter(pk__in=quantities).update(
+        stock_quantity=F('stock_quantity') + _quantity_case(quantities),
+        updated_at=timezone.now()
+    )
+    stock_changed(Product.objects.filter(pk__in=quantities).only('pk', 'slug', 'category'))
+    return released
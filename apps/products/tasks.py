@@ -0,0 +1,65 @@
+# apps/products/tasks.py
+
+"""
+Celery Tasks for Products
+
+Background maintenance of denormalized product data and stock alerts.
+"""
+
+from celery import shared_task
+from django.core.mail import mail_admins
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_category_summaries(categories=None):
+    """
+    Recompute category facet summaries.
+    
+    Args:
+        categories (list): Category names to refresh, or None for all
+            categories (periodic full refresh)
+    
+    Returns:
+        int: Number of category summaries written
+    """
+    from .models import CategorySummary
+    
+    refreshed = CategorySummary.refresh(categories)
+    logger.info(f"Refreshed {refreshed} category summaries")
+    return refreshed
+
+
+@shared_task
+def check_low_stock(stock_levels):
+    """
+    Alert the site admins about products that dropped to their low stock threshold.
+    
+    Only products whose stock crossed the threshold with this change are
+    reported, so later orders of an already low product don't alert again.
+    
+    Args:
+        stock_levels (list): [product_id, stock before, stock after] triples
+    
+    Returns:
+        int: Number of products that crossed their threshold
+    """
+    from .models import Product
+    
+    levels = {str(product_id): (before, after) for product_id, before, after in stock_levels}
+    products = Product.objects.filter(id__in=levels, is_active=True).values_list(
+        'id', 'name', 'sku', 'low_stock_threshold'
+    )
+    low_stock = []
+    for product_id, name, sku, threshold in products:
+        before, after = levels[str(product_id)]
+        if after <= threshold < before:
+            low_stock.append((name, sku, after))
+    
+    if low_stock:
+        lines = [f"{name} ({sku}): {stock} left" for name, sku, stock in low_stock]
+        logger.warning(f"Low stock: {'; '.join(lines)}")
+        mail_admins(f"Low stock on {len(low_stock)} products", '\n'.join(lines), fail_silently=True)
+    return len(low_stock)
@@ -0,0 +1,44 @@
+# apps/products/testing.py
+
+"""
+Product Test Helpers
+
+Factories shared by the test suites of the apps that work with products.
+"""
+
+from decimal import Decimal
+
+from .models import Product, ProductImage
+
+
+def create_products(count, price=Decimal('10.00'), compare_price=None, stock_quantity=10,
+                    prefix='Test Product', with_images=False):
+    """
+    Create `count` active products priced `price`, `price` + 1, ...
+
+    Args:
+        count (int): Number of products
+        price (Decimal): Price of the first product
+        compare_price (Decimal): Compare price of the first product, if any
+        stock_quantity (int): Stock of every product
+        prefix (str): Name prefix; names are '<prefix> <index>'
+        with_images (bool): Give each product a primary and a secondary image
+
+    Returns:
+        list: The created products
+    """
+    products = []
+    for index in range(count):
+        product = Product.objects.create(
+            name=f'{prefix} {index}',
+            description='A product used in tests',
+            category='Electronics',
+            price=price + index,
+            compare_price=compare_price + index if compare_price is not None else None,
+            stock_quantity=stock_quantity,
+        )
+        if with_images:
+            ProductImage.objects.create(product=product, image=f'products/{index}-a.jpg', is_primary=True)
+            ProductImage.objects.create(product=product, image=f'products/{index}-b.jpg', order=1)
+        products.append(product)
+    return products
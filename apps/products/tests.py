@@ -1,3 +1,455 @@
-from django.test import TestCase
+# apps/products/tests.py
 
-# Create your tests here.
+"""
+Product Tests
+"""
+
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from .autocomplete import prefix_cache
+from .management.commands.benchmark_product_queries import is_sequential_scan
+from .models import Product, ProductImage
+from .search import build_search_query
+from .testing import create_products
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductListQueryCountTests(TestCase):
+    """The product list must not issue per-row queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_products(30, with_images=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def _count_list_queries(self, page_size):
+        cache.clear()
+        url = reverse('products:product-list-create')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'page_size': page_size}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), page_size)
+        return len(context.captured_queries)
+
+    def test_query_count_is_constant_regardless_of_page_size(self):
+        self.assertEqual(self._count_list_queries(2), self._count_list_queries(30))
+
+    def test_primary_image_is_returned(self):
+        url = reverse('products:product-list-create')
+        response = self.client.get(url, {'page_size': 30}, secure=True)
+        for item in response.json()['results']:
+            self.assertTrue(item['primary_image'].endswith('-a.jpg'))
+
+
+class PrimaryImagePathTests(TestCase):
+    """Product.primary_image_path follows ProductImage writes"""
+
+    def setUp(self):
+        self.product = create_products(1)[0]
+
+    def _cached_path(self):
+        return Product.objects.values_list('primary_image_path', flat=True).get(pk=self.product.pk)
+
+    def test_primary_toggle_updates_cached_path(self):
+        first = ProductImage.objects.create(product=self.product, image='products/first.jpg', is_primary=True)
+        self.assertEqual(self._cached_path(), 'products/first.jpg')
+
+        ProductImage.objects.create(product=self.product, image='products/second.jpg', is_primary=True)
+        self.assertEqual(self._cached_path(), 'products/second.jpg')
+
+        # Saving the demoted image must not clobber the new primary
+        first.refresh_from_db()
+        first.save()
+        self.assertEqual(self._cached_path(), 'products/second.jpg')
+
+    def test_deleting_primary_image_clears_cached_path(self):
+        image = ProductImage.objects.create(product=self.product, image='products/only.jpg', is_primary=True)
+        image.delete()
+        self.assertEqual(self._cached_path(), '')
+
+    def test_backfill_command(self):
+        ProductImage.objects.create(product=self.product, image='products/only.jpg', is_primary=True)
+        Product.objects.update(primary_image_path='')
+
+        out = StringIO()
+        call_command('backfill_primary_images', stdout=out)
+        self.assertEqual(self._cached_path(), 'products/only.jpg')
+        self.assertIn('Backfilled primary image path for 1 products', out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductResponseCacheTests(TestCase):
+    """Public product responses are cached and invalidated by writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.product = create_products(1, with_images=True)[0]
+        self.list_url = reverse('products:product-list-create')
+        self.detail_url = reverse('products:product-detail-update-delete', args=[self.product.slug])
+
+    def _get(self, url, params=None):
+        response = self.client.get(url, params or {}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_repeat_requests_are_served_from_cache(self):
+        self._get(self.list_url, {'category': 'electronics'})
+        self._get(self.detail_url)
+        with self.assertNumQueries(0):
+            self._get(self.list_url, {'category': 'ELECTRONICS'})
+            self._get(self.detail_url)
+
+    def test_stock_change_invalidates_list_and_detail(self):
+        self._get(self.list_url, {'category': 'Electronics'})
+        self._get(self.detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_quantity = 0
+            self.product.save()
+
+        self.assertEqual(self._get(self.list_url, {'category': 'Electronics'})['results'][0]['stock_quantity'], 0)
+        self.assertEqual(self._get(self.detail_url)['stock_quantity'], 0)
+
+    def test_category_move_invalidates_old_category(self):
+        self._get(self.list_url, {'category': 'Electronics'})
+
+        product = Product.objects.get(pk=self.product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.category = 'Books'
+            product.save()
+
+        self.assertEqual(self._get(self.list_url, {'category': 'Electronics'})['results'], [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductConditionalGetTests(TestCase):
+    """ETag / Last-Modified handling on product endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.product = create_products(1, with_images=True)[0]
+        self.list_url = reverse('products:product-list-create')
+        self.detail_url = reverse('products:product-detail-update-delete', args=[self.product.pk])
+
+    def test_detail_if_none_match_returns_304(self):
+        response = self.client.get(self.detail_url, secure=True)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, secure=True, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_changes_when_images_change(self):
+        etag = self.client.get(self.detail_url, secure=True)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image='products/extra.jpg', order=2)
+
+        response = self.client.get(self.detail_url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['images']), 3)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+
+        response = self.client.get(self.detail_url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['images']), 2)
+
+    def test_list_etag_changes_when_product_changes(self):
+        etag = self.client.get(self.list_url, secure=True)['ETag']
+        response = self.client.get(self.list_url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('99.00')
+            self.product.save()
+
+        response = self.client.get(self.list_url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_if_modified_since_after_delete_returns_fresh_list(self):
+        newest = create_products(1, prefix='Newest')[0]
+        response = self.client.get(self.list_url, secure=True)
+        self.assertEqual(response.json()['pagination']['count'], 2)
+        self.assertNotIn('Last-Modified', response)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            newest.delete()
+
+        # A client that only revalidates by date must still see the deletion
+        response = self.client.get(self.list_url, secure=True, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pagination']['count'], 1)
+
+
+class ProductCursorPaginationTests(TestCase):
+    """Keyset pagination mode of ProductPagination"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(7)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('products:product-list-create')
+
+    def _walk(self, params):
+        """Follow next links from the first cursor page and return all ids"""
+        response = self.client.get(self.url, params, secure=True).json()
+        self.assertNotIn('count', response['pagination'])
+        self.assertNotIn('total_pages', response['pagination'])
+        ids = [item['id'] for item in response['results']]
+        while response['pagination']['next']:
+            response = self.client.get(response['pagination']['next'], secure=True).json()
+            ids.extend(item['id'] for item in response['results'])
+        return ids, response
+
+    def test_walks_catalog_newest_first_without_duplicates(self):
+        ids, last_page = self._walk({'cursor': '', 'page_size': 3})
+        self.assertEqual(ids, [str(product.pk) for product in reversed(self.products)])
+        self.assertTrue(last_page['pagination']['has_previous'])
+
+    def test_price_ordering(self):
+        ids, _ = self._walk({'cursor': '', 'page_size': 2, 'ordering': '-price'})
+        expected = sorted(self.products, key=lambda product: product.price, reverse=True)
+        self.assertEqual(ids, [str(product.pk) for product in expected])
+
+    def test_insert_between_pages_does_not_shift_results(self):
+        first = self.client.get(self.url, {'cursor': '', 'page_size': 3}, secure=True).json()
+        Product.objects.create(
+            name='Brand New', description='Inserted while paging', category='Books', price=Decimal('1.00')
+        )
+        cache.clear()
+        second = self.client.get(first['pagination']['next'], secure=True).json()
+        expected = [str(product.pk) for product in reversed(self.products)][3:6]
+        self.assertEqual([item['id'] for item in second['results']], expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get(self.url, {'cursor': '', 'page_size': 3}, secure=True).json()
+        second = self.client.get(first['pagination']['next'], secure=True).json()
+        previous = self.client.get(second['pagination']['previous'], secure=True).json()
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_include_count_and_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': '', 'include_count': 'true'}, secure=True).json()
+        self.assertEqual(response['pagination']['count'], 7)
+
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'}, secure=True)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductCountCacheTests(TestCase):
+    """List counts are cached per filter signature and invalidated by writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.products = create_products(3)
+        self.url = reverse('products:product-list-create')
+
+    def _pagination(self, params):
+        return self.client.get(self.url, params, secure=True).json()['pagination']
+
+    def test_count_is_reused_across_pages_and_orderings(self):
+        self.assertEqual(self._pagination({'page_size': 1})['count'], 3)
+        # Same filter signature: no COUNT(*), only the page query runs
+        with self.assertNumQueries(1):
+            pagination = self._pagination({'page_size': 1, 'page': 2, 'ordering': 'price'})
+        self.assertEqual(pagination['count'], 3)
+        self.assertFalse(pagination['count_is_estimate'])
+
+    @override_settings(PRODUCT_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_estimated_count_does_not_decide_the_pages(self):
+        for estimate in (1, 100):
+            cache.clear()
+            with mock.patch('apps.products.pagination.estimate_count', return_value=estimate):
+                pages = [self.client.get(self.url, {'page_size': 1, 'page': page}, secure=True) for page in (1, 2, 3, 4)]
+
+            self.assertEqual([response.status_code for response in pages], [200, 200, 200, 404])
+            pagination = [response.json()['pagination'] for response in pages[:3]]
+            self.assertEqual([page['has_next'] for page in pagination], [True, True, False])
+            self.assertIsNone(pagination[2]['next'])
+            self.assertEqual(pagination[0]['count'], estimate)
+            self.assertTrue(pagination[0]['count_is_estimate'])
+            self.assertIsNone(pagination[0]['total_pages'])
+
+    def test_product_write_invalidates_cached_count(self):
+        self.assertEqual(self._pagination({'in_stock': 'true'})['count'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].stock_quantity = 0
+            self.products[0].save()
+        self.assertEqual(self._pagination({'in_stock': 'true'})['count'], 2)
+
+
+class ProductSearchTests(TestCase):
+    """?search= uses full-text search on PostgreSQL and icontains elsewhere"""
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('products:product-list-create')
+        self.by_name = Product.objects.create(
+            name='Gaming Laptop', description='Fast machine', category='Electronics', price=Decimal('999.00')
+        )
+        self.by_description = Product.objects.create(
+            name='Laptop Sleeve', description='Fits any gaming laptop', category='Accessories', price=Decimal('19.00')
+        )
+        Product.objects.create(name='Desk Lamp', description='Warm light', category='Home', price=Decimal('25.00'))
+
+    def _search(self, term, **params):
+        response = self.client.get(self.url, {'search': term, **params}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_search_matches_name_and_description(self):
+        self.assertCountEqual(self._search('gaming'), [str(self.by_name.pk), str(self.by_description.pk)])
+
+    def test_terms_without_words_build_no_query(self):
+        self.assertIsNone(build_search_query(['!!', '--']))
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_prefix_matching_and_rank_ordering(self):
+        # Partial word, and the name (weight A) hit ranks above the description (weight D) hit
+        self.assertEqual(self._search('gam'), [str(self.by_name.pk), str(self.by_description.pk)])
+        # An explicit ordering wins over relevance
+        self.assertEqual(self._search('gam', ordering='price'), [str(self.by_description.pk), str(self.by_name.pk)])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_search_vector_follows_saves(self):
+        self.by_name.name = 'Gaming Notebook'
+        self.by_name.save()
+        self.assertIn(str(self.by_name.pk), self._search('notebook'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductAutocompleteTests(TestCase):
+    """GET /products/autocomplete/ suggestions and their in-process cache"""
+
+    def setUp(self):
+        cache.clear()
+        prefix_cache.clear()
+        self.url = reverse('products:product-autocomplete')
+        self.laptop = Product.objects.create(
+            name='Gaming Laptop', description='Fast machine', category='Electronics',
+            price=Decimal('999.00'), sku='LAP-001'
+        )
+        ProductImage.objects.create(product=self.laptop, image='products/laptop.jpg', is_primary=True)
+        Product.objects.create(name='Desk Lamp', description='Warm light', category='Home', price=Decimal('25.00'))
+
+    def _suggest(self, term, **params):
+        response = self.client.get(self.url, {'q': term, **params}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_matches_name_and_sku(self):
+        for term in ('lapto', 'LAP-0'):
+            suggestions = self._suggest(term)
+            self.assertEqual([item['slug'] for item in suggestions], ['gaming-laptop'])
+        self.assertTrue(suggestions[0]['primary_image'].endswith('products/laptop.jpg'))
+
+    def test_short_terms_return_nothing(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self._suggest('l'), [])
+
+    def test_hot_prefixes_are_cached_until_a_product_changes(self):
+        self._suggest('lamp')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self._suggest('LAMP')), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Lamp Shade', description='Linen', category='Home', price=Decimal('9.00'))
+        self.assertEqual(len(self._suggest('lamp')), 2)
+
+
+class ProductListIndexTests(TestCase):
+    """List filters and orderings are served by the product indexes"""
+
+    @skipUnless(connection.vendor == 'postgresql', 'Index choice is checked against PostgreSQL plans')
+    def test_benchmark_reports_no_sequential_scans(self):
+        out = StringIO()
+        call_command('benchmark_product_queries', seed=500, repeat=1, check=True, stdout=out)
+        self.assertNotIn('SEQ SCAN', out.getvalue())
+
+    def test_benchmark_rolls_back_synthetic_rows(self):
+        out = StringIO()
+        call_command('benchmark_product_queries', seed=50, repeat=1, stdout=out)
+        self.assertIn('Seeded 50 products', out.getvalue())
+        self.assertFalse(Product.objects.exists())
+
+    def test_full_table_scan_is_flagged(self):
+        table = Product._meta.db_table
+        # Nothing indexes the description, so this has to read every row
+        plan = Product.objects.filter(description__contains='x').order_by('description').explain()
+        self.assertTrue(is_sequential_scan(plan, table), plan)
+
+        self.assertTrue(is_sequential_scan(f'Limit\n  ->  Seq Scan on {table}\n', table))
+        self.assertTrue(is_sequential_scan(f'3 0 0 SCAN {table}', table))
+        self.assertFalse(is_sequential_scan(f'3 0 0 SCAN {table} USING INDEX products_pr_created_idx', table))
+        self.assertFalse(is_sequential_scan(f'Index Scan using products_pr_created_idx on {table}', table))
+
+    def test_category_filter_is_case_insensitive(self):
+        create_products(2)
+        response = self.client.get(reverse('products:product-list-create'), {'category': 'eLeCtRoNiCs'}, secure=True)
+        self.assertEqual(response.json()['pagination']['count'], 2)
+
+
+class CategorySummaryTests(TestCase):
+    """GET /products/categories/ facet counts follow product writes"""
+
+    def setUp(self):
+        self.url = reverse('products:product-categories')
+
+    def _categories(self):
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return {item['key']: item for item in response.json()['data']}
+
+    def _create(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(description='Facet test', **fields)
+
+    def test_facets_follow_creates_moves_and_deletes(self):
+        laptop = self._create(name='Laptop', category='Electronics', price=Decimal('900.00'), stock_quantity=3)
+        self._create(name='Phone', category='electronics', price=Decimal('300.00'))
+        self._create(name='Novel', category='Books', price=Decimal('12.00'), stock_quantity=1)
+
+        categories = self._categories()
+        self.assertEqual(categories['electronics']['product_count'], 2)
+        self.assertEqual(categories['electronics']['in_stock_count'], 1)
+        self.assertEqual(Decimal(categories['electronics']['min_price']), Decimal('300.00'))
+        self.assertEqual(Decimal(categories['electronics']['max_price']), Decimal('900.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            laptop.category = 'Books'
+            laptop.save()
+        categories = self._categories()
+        self.assertEqual(categories['electronics']['product_count'], 1)
+        self.assertEqual(categories['books']['product_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for product in Product.objects.filter(category='Books'):
+                product.delete()
+        self.assertNotIn('books', self._categories())
+
+    def test_menu_is_one_query(self):
+        self._create(name='Laptop', category='Electronics', price=Decimal('900.00'))
+        with self.assertNumQueries(1):
+            self._categories()
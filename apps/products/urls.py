@@ -12,6 +12,8 @@ from django.urls import path
 from .views import (
     ProductListCreateView,
     ProductDetailUpdateDeleteView,
+    ProductAutocompleteView,
+    ProductCategoryListView,
 )
 
 app_name = 'products'
@@ -20,6 +22,12 @@ urlpatterns = [
     # Product List & Create
     path('', ProductListCreateView.as_view(), name='product-list-create'),
     
+    # Search-as-you-type suggestions (must precede the id/slug route)
+    path('autocomplete/', ProductAutocompleteView.as_view(), name='product-autocomplete'),
+    
+    # Category facet counts
+    path('categories/', ProductCategoryListView.as_view(), name='product-categories'),
+    
     # Individual product endpoint
     path('<str:pk>/', ProductDetailUpdateDeleteView.as_view(), name='product-detail-update-delete'),
 ]
@@ -31,6 +39,8 @@ urlpatterns = [
 PRODUCTS ENDPOINTS:
 - GET    /api/v1/products/           → List all products with filtering
 - POST   /api/v1/products/           → Create new product (Admin only)
+- GET    /api/v1/products/autocomplete/?q=  → Name/SKU suggestions
+- GET    /api/v1/products/categories/  → Categories with product counts
 - GET    /api/v1/products/{id}/      → Get product details  
 - PUT    /api/v1/products/{id}/      → Full update product (Admin only)
 - PATCH  /api/v1/products/{id}/      → Partial update product (Admin only)
@@ -4,37 +4,96 @@
 """
 Simple Product Views - Products Only, No Category APIs
 
-Category is just a text field in products.
+Category is just a text field in products. The categories endpoint is a
+read-only facet summary derived from products.
 """
 
-from rest_framework import generics, filters,  status
+from rest_framework import generics, status
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
 from drf_spectacular.utils import extend_schema, OpenApiExample
 
 from .permissions import IsAdminUser
-from .models import Product
+from .models import Product, CategorySummary
 from .serializers import (
     ProductListSerializer,
     ProductDetailSerializer,
-    ProductCreateUpdateSerializer
+    ProductCreateUpdateSerializer,
+    CategorySummarySerializer
 )
 from .filters import ProductFilter
+from .search import ProductSearchFilter, ProductOrderingFilter
 from rest_framework.response import Response
 from .pagination import ProductPagination
+from .cache import (
+    get_cache_timeout,
+    normalize_list_params,
+    product_list_cache_key,
+    product_detail_cache_key
+)
+from .conditional import Validators
+from .autocomplete import get_suggestions
+
+
+class CachedConditionalGetMixin:
+    """
+    Serve GET requests from the response cache and answer conditional
+    requests (If-None-Match / If-Modified-Since) with 304 Not Modified.
+    
+    Cached entries carry their own validators, so a cache hit costs no
+    queries at all and a miss costs one validator lookup before serializing.
+    """
+    
+    def get_cache_key(self):
+        raise NotImplementedError
+    
+    def get_validators(self):
+        """Return Validators for the current request, or None if not found"""
+        raise NotImplementedError
+    
+    def cached_conditional_get(self, handler, request, *args, **kwargs):
+        # Key is computed before querying so a concurrent write can't be cached under the new generation
+        cache_key = self.get_cache_key()
+        cached = cache.get(cache_key)
+        if cached is not None:
+            validators = Validators(cached['etag'], cached['last_modified'])
+            return (
+                validators.not_modified_response(request) or
+                validators.apply(Response(cached['data']))
+            )
+        
+        # Views may also set self.validators later, from data the handler loads anyway
+        self.validators = self.get_validators()
+        if self.validators is not None:
+            not_modified = self.validators.not_modified_response(request)
+            if not_modified is not None:
+                return not_modified
+        
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and self.validators is not None:
+            cache.set(cache_key, {
+                'data': response.data,
+                'etag': self.validators.etag,
+                'last_modified': self.validators.last_modified,
+            }, get_cache_timeout())
+            self.validators.apply(response)
+        return response
 
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(CachedConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all products with filtering and search OR Create new product with images
     """
     
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductOrderingFilter]
     filterset_class = ProductFilter
+    # icontains fallback when full-text search is unavailable (non-PostgreSQL)
     search_fields = ['name', 'description', 'sku', 'category']
     ordering_fields = ['name', 'price', 'created_at', 'category']
     ordering = ['-created_at']
@@ -52,8 +111,40 @@ class ProductListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         if self.request.method == 'GET':
+            # Primary images come from Product.primary_image_path - no join needed
             return Product.objects.filter(is_active=True)
         return Product.objects.all()
+    
+    def get_cache_key(self):
+        return product_list_cache_key(self.request)
+    
+    def get_validators(self):
+        # Built in list() from the page rows, which are loaded anyway
+        return None
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List products, answering conditional requests before serializing.
+        
+        The ETag covers the page rows (ids and updated_at) plus the result
+        count, so edits, deletions and inserts that shift the page all change it.
+        There is no Last-Modified: a deleted or deactivated product leaves the
+        page with no newer timestamp, so If-Modified-Since would answer 304.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        
+        self.validators = Validators.build(
+            normalize_list_params(request.query_params),
+            self.paginator.get_result_count(),
+            *[f'{product.pk}@{product.updated_at.isoformat()}' for product in page]
+        )
+        not_modified = self.validators.not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @extend_schema(
         summary="List all products",
@@ -63,14 +154,22 @@ class ProductListCreateView(generics.ListCreateAPIView):
         **Filters:**
         - category: Filter by category name (e.g., ?category=Electronics)
         - price: Filter by price range
-        - search: Search by name, description, SKU, or category
+        - search: Full-text search over name, SKU, category and description, ranked by
+          relevance unless ?ordering= is given. Words are prefix-matched (?search=lapt).
         
-        **Public access.**
+        **Pagination:**
+        - page / page_size: Page-number pagination (default)
+        - cursor: Keyset pagination - pass an empty ?cursor= for the first page, then follow
+          the next/previous links. Supports ordering by -created_at (default), created_at,
+          price and -price. Count is omitted unless ?include_count=true.
+        
+        **Public access.** Responses are cached and invalidated on product writes.
+        Supports conditional requests via ETag / If-None-Match (304 Not Modified).
         """,
         tags=['Products']
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return self.cached_conditional_get(self.list, request, *args, **kwargs)
 
     @extend_schema(
         summary="Create new product with images",
@@ -115,7 +214,7 @@ class ProductListCreateView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class ProductDetailUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailUpdateDeleteView(CachedConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Get product details OR Update product OR Delete product
     """
@@ -139,15 +238,19 @@ class ProductDetailUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
             return Product.objects.filter(is_active=True)
         return Product.objects.all()
     
+    def get_lookup_filter(self):
+        """Filter kwargs for the id-or-slug lookup value (UUID first, then slug)"""
+        lookup_value = self.kwargs.get('pk')
+        if len(lookup_value) == 36 and '-' in lookup_value:
+            return {'id': lookup_value}
+        return {'slug': lookup_value}
+    
     def get_object(self):
         lookup_value = self.kwargs.get('pk')
         
         # Try UUID first, then slug
         try:
-            if len(lookup_value) == 36 and '-' in lookup_value:
-                return get_object_or_404(self.get_queryset(), id=lookup_value)
-            else:
-                return get_object_or_404(self.get_queryset(), slug=lookup_value)
+            return get_object_or_404(self.get_queryset(), **self.get_lookup_filter())
         except Exception as e:
             # If both UUID and slug fail, raise 404
             from django.http import Http404
@@ -155,11 +258,25 @@ class ProductDetailUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 
     @extend_schema(
         summary="Get product details",
-        description="Retrieve complete product information including images, category, pricing, and stock details. Use product ID or slug.",
+        description="Retrieve complete product information including images, category, pricing, and stock details. Use product ID or slug. Supports conditional requests via ETag / Last-Modified (304 Not Modified).",
         tags=['Products']
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return self.cached_conditional_get(self.retrieve, request, *args, **kwargs)
+    
+    def get_cache_key(self):
+        return product_detail_cache_key(self.request, self.kwargs.get('pk'))
+    
+    def get_validators(self):
+        """Validators from a single indexed lookup of (id, updated_at)"""
+        try:
+            row = self.get_queryset().filter(**self.get_lookup_filter()).values_list('id', 'updated_at').first()
+        except Exception:
+            return None  # Malformed UUID - let retrieve() raise the 404
+        if row is None:
+            return None
+        product_id, updated_at = row
+        return Validators.build(product_id, updated_at, last_modified=updated_at)
 
     @extend_schema(
         summary="Update product with images",
@@ -206,4 +323,72 @@ class ProductDetailUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
      return Response(
         {"message": f"Product '{product_name}' permanently deleted"}, 
         status=status.HTTP_200_OK
-    )
\ No newline at end of file
+    )
+
+
+class ProductAutocompleteView(APIView):
+    """
+    Search-as-you-type suggestions by product name or SKU
+    """
+    
+    permission_classes = [AllowAny]
+    default_limit = 8
+    max_limit = 20
+    
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except (TypeError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+    
+    @extend_schema(
+        summary="Autocomplete products",
+        description="""
+        Top matching active products for a partial name or SKU (?q=lapt, ?q=PRD-1A).
+        Tolerates typos on PostgreSQL (trigram similarity). Returns id, name, slug
+        and primary image. Terms shorter than 2 characters return no suggestions.
+        
+        **Query params:** q (required), limit (default 8, max 20)
+        """,
+        tags=['Products']
+    )
+    def get(self, request):
+        suggestions = get_suggestions(request.query_params.get('q', ''), self.get_limit(request))
+        data = [
+            {
+                **suggestion,
+                'primary_image': (
+                    request.build_absolute_uri(suggestion['primary_image'])
+                    if suggestion['primary_image'] else None
+                ),
+            }
+            for suggestion in suggestions
+        ]
+        return Response({'success': True, 'data': data})
+
+
+class ProductCategoryListView(generics.ListAPIView):
+    """
+    Category facets: active product count, in-stock count and price range
+    """
+    
+    permission_classes = [AllowAny]
+    serializer_class = CategorySummarySerializer
+    pagination_class = None
+    queryset = CategorySummary.objects.filter(product_count__gt=0)
+    
+    @extend_schema(
+        summary="List categories with product counts",
+        description="""
+        Category menu with facet counts per category: active products, products in stock,
+        and the min/max price. Served from a summary table (one row per category) that is
+        refreshed in the background after product changes, so counts may lag by a few seconds.
+        
+        Use `name` as the ?category= filter on the product list (case-insensitive).
+        """,
+        tags=['Products']
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response({'success': True, 'data': serializer.data})
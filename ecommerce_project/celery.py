@@ -34,4 +34,18 @@ app.conf.beat_schedule = {
         'task': 'apps.authentication.tasks.cleanup_old_login_attempts',
         'schedule': crontab(hour=3, minute=0),  # Run daily at 3 AM
     },
+    'refresh-category-summaries': {
+        # Writes refresh their own categories; this catches bulk/raw SQL changes
+        'task': 'apps.products.tasks.refresh_category_summaries',
+        'schedule': crontab(minute='*/30'),  # Run every 30 minutes
+    },
+    'persist-dirty-carts': {
+        # Only does work with CART_BACKEND=redis
+        'task': 'apps.carts.tasks.persist_dirty_carts',
+        'schedule': 60.0,  # Run every minute
+    },
+    'release-expired-reservations': {
+        'task': 'apps.orders.tasks.release_expired_reservations',
+        'schedule': 60.0,  # Run every minute
+    },
 }
\ No newline at end of file
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',      # Session framework
     'django.contrib.messages',      # Messaging framework
     'django.contrib.staticfiles',   # Static files management
+    'django.contrib.postgres',      # Trigram lookups and search (PostgreSQL)
     
     # Third-party apps
     'rest_framework',               # Django REST Framework for APIs
@@ -269,6 +270,27 @@ CACHES = {
     }
 }
 
+# Product API response cache lifetime (seconds) - writes invalidate earlier
+PRODUCT_CACHE_TIMEOUT = config('PRODUCT_CACHE_TIMEOUT', default=300, cast=int)
+
+# Product list counts: cache lifetime (seconds) and the planner-estimated row count
+# above which the exact COUNT(*) is replaced by an estimate (0 disables estimates)
+PRODUCT_COUNT_CACHE_TIMEOUT = config('PRODUCT_COUNT_CACHE_TIMEOUT', default=60, cast=int)
+PRODUCT_COUNT_ESTIMATE_THRESHOLD = config('PRODUCT_COUNT_ESTIMATE_THRESHOLD', default=50000, cast=int)
+
+# Per-process LRU of product autocomplete results (entries; 0 disables it)
+PRODUCT_AUTOCOMPLETE_CACHE_SIZE = config('PRODUCT_AUTOCOMPLETE_CACHE_SIZE', default=1024, cast=int)
+
+# Cart storage: 'database' (Cart/CartItem rows) or 'redis' (one hash per user,
+# written back to the database by Celery and at checkout)
+CART_BACKEND = config('CART_BACKEND', default='database')
+CART_REDIS_URL = config('CART_REDIS_URL', default=f'redis://{REDIS_HOST}:{REDIS_PORT}/2')
+CART_REDIS_TTL = config('CART_REDIS_TTL', default=30 * 24 * 60 * 60, cast=int)  # 30 days
+
+# Seconds an unpaid order holds its stock before the reservation sweeper
+# gives it back and cancels the order
+ORDER_RESERVATION_TTL = config('ORDER_RESERVATION_TTL', default=30 * 60, cast=int)  # 30 minutes
+
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=f'redis://{REDIS_HOST}:{REDIS_PORT}/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=f'redis://{REDIS_HOST}:{REDIS_PORT}/0')
@@ -279,6 +301,14 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 
+# Fail fast when the broker is down: publishing doesn't retry the
+# connection, and enqueue_on_commit then runs the task inline
+CELERY_BROKER_CONNECTION_TIMEOUT = 2  # seconds
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'max_retries': 0,
+    'socket_connect_timeout': 2,
+}
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:3000', cast=Csv())
 CORS_ALLOW_CREDENTIALS = True  # Allow cookies/auth headers